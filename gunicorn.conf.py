@@ -0,0 +1,23 @@
+import os
+# gunicorn reads this file from the working directory: `gunicorn app:app`.
+# Workers come from WEB_CONCURRENCY and the address from PORT, as on Render.
+#
+# The app is imported once in the master and every worker is forked from it,
+# so a worker boots in milliseconds instead of re-importing Flask, SQLAlchemy
+# and the models (see `flask bench-startup`). Set GUNICORN_PRELOAD=0 to load
+# it in each worker again, e.g. for --reload while developing.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+def on_starting(server):
+    """Apply pending migrations once, in the master, when MIGRATE_ON_START=1."""
+    if os.environ.get("MIGRATE_ON_START", "0") != "1":
+        return
+    from webwonders.migrations import run_migrations
+    with server.app.wsgi().app_context():
+        for version, description in run_migrations():
+            server.log.info("Applied migration %d: %s", version, description)
+def post_fork(server, worker):
+    """Give each worker its own connections instead of the master's pooled ones."""
+    from webwonders.database import db
+    with worker.app.wsgi().app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,61 @@
+from datetime import date
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from webwonders import create_app
+from webwonders.database import db
+from webwonders.migrations import run_migrations
+from webwonders.models import Client, ClientInvoice, ContentItem, EffortLog, Employee, Task
+# The list pages load related clients and assignees in the same SELECT, so
+# the statements a page issues must not grow with the rows it shows. The
+# search term matches every seeded content item.
+LIST_PAGES = ["/", "/tasks", "/clients", "/planner", "/accounts", "/efforts", "/search?q=post"]
+@pytest.fixture
+def app():
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": "sqlite://",
+        "TESTING": True,
+        "CACHE_BACKEND": "none",
+        "JOB_WORKER": False,
+        "SWEEPER_INTERVAL": 0,
+        "PAGE_SIZE": 100,
+    })
+    with app.app_context():
+        run_migrations()
+    return app
+def add_rows(app, count, start=0):
+    """Add ``count`` clients, each with an employee, content item, effort log, task and invoice dated this month."""
+    today = date.today()
+    with app.app_context():
+        for i in range(start, start + count):
+            client = Client(name="Client %03d" % i, monthly_retainer=1000)
+            employee = Employee(name="Employee %03d" % i)
+            db.session.add_all([client, employee])
+            db.session.flush()
+            db.session.add_all([
+                ContentItem(client_id=client.id, date=today, title="Post %d" % i),
+                EffortLog(client_id=client.id, employee_id=employee.id, date=today, time_minutes=30),
+                Task(title="Task %d" % i, client_id=client.id, assigned_to=employee.id, due_date=today),
+                ClientInvoice(client_id=client.id, month=today.strftime("%Y-%m"), amount=1000, due_date=today),
+            ])
+        db.session.commit()
+def count_statements(client, path):
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(Engine, "before_cursor_execute", count)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(Engine, "before_cursor_execute", count)
+    assert response.status_code == 200
+    return len(statements)
+@pytest.mark.parametrize("path", LIST_PAGES)
+def test_list_page_query_count_does_not_grow_with_rows(app, path):
+    client = app.test_client()
+    add_rows(app, 10)
+    client.get(path)
+    few = count_statements(client, path)
+    add_rows(app, 50, start=10)
+    many = count_statements(client, path)
+    assert few == many
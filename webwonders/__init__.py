@@ -0,0 +1,31 @@
+from flask import Flask
+from .config import engine_options, load_environ
+from .database import db, tune_sqlite
+from .pagination import url_with_args
+def create_app(config=None):
+    """Build the Web Wonders app from the environment, with ``config`` overriding it.
+
+    Creating the app never touches the database: run `flask init-db` (or
+    run_migrations() in an app context) to create tables and apply migrations.
+    The views, API and commands are imported here rather than with the package,
+    so importing webwonders.models alone does not load the whole app.
+    """
+    from . import api, cli, jobs, metrics, scheduler, views
+    app = Flask(__name__)
+    load_environ(app.config)
+    app.config.update(config or {})
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config["SQLALCHEMY_DATABASE_URI"]))
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            tune_sqlite(engine, app.config)
+            metrics.track_queries(engine, app)
+    app.register_blueprint(metrics.bp)
+    app.register_blueprint(views.bp)
+    app.register_blueprint(api.api)
+    app.register_blueprint(cli.bp)
+    app.before_request(scheduler.start_sweeper)
+    app.before_request(jobs.start_job_worker)
+    app.after_request(jobs.wake_job_worker)
+    app.add_template_global(url_with_args)
+    return app
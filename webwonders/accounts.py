@@ -0,0 +1,137 @@
+from flask import current_app
+from sqlalchemy import and_, case, func, select
+from datetime import date, timedelta
+from .database import db, insert_ignoring_conflicts
+from .models import Client, ClientInvoice, ClientPayment
+from .jobs import enqueue_job
+from .scorecard import queue_client_metrics
+from .scheduler import sweep_overdue
+from .analytics import ledger_rows_for_payments, month_end, parse_month, record_ledger, record_paid_invoice
+# ----------------------
+# Payments and receivables
+# ----------------------
+# ClientInvoice.amount_paid is kept in step with its payments by
+# record_payment(), which adds to it in the database (amount_paid + x) rather
+# than writing back a total computed in Python, so two partial payments
+# landing together in different workers cannot lose one another.
+AGING_BUCKETS = ("current", "0-30", "31-60", "61-90", "90+")
+def record_payment(invoice, amount, payment_date, mode=None, reference=None, notes=None, defer=False):
+    """Add a payment and apply it to its invoice (caller commits).
+
+    Returns (payment, settled) where settled is True when this payment is the
+    one that brought the invoice to fully paid. With ``defer`` the revenue
+    rollup for a settled invoice is queued as a background job.
+    """
+    payment = ClientPayment(
+        client_id=invoice.client_id,
+        invoice_id=invoice.id,
+        amount=amount,
+        payment_date=payment_date,
+        mode=mode,
+        reference=reference,
+        notes=notes,
+    )
+    db.session.add(payment)
+    table = ClientInvoice.__table__
+    db.session.execute(
+        table.update().where(table.c.id == invoice.id).values(amount_paid=table.c.amount_paid + amount)
+    )
+    # Only the payment that crosses the line sees a row to flip
+    settled = db.session.execute(
+        table.update().where(
+            table.c.id == invoice.id,
+            table.c.status != "paid",
+            table.c.amount_paid >= table.c.amount
+        ).values(status="paid")
+    ).rowcount == 1
+    db.session.expire(invoice, ["amount_paid", "status"])
+    ledger = ledger_rows_for_payments([{"client_id": invoice.client_id, "amount": amount, "payment_date": payment_date}])
+    if defer:
+        enqueue_job("ledger_rollup", {"rows": ledger})
+    else:
+        record_ledger(ledger)
+    if settled and defer:
+        enqueue_job("revenue_rollup", {
+            "month": invoice.due_date.strftime("%Y-%m"), "client_id": invoice.client_id, "amount": invoice.amount,
+        }, key="revenue_rollup:%d" % invoice.id)
+    elif settled:
+        record_paid_invoice(invoice)
+    return payment, settled
+def receivables_aging(today=None):
+    """Outstanding balance per client split into days-past-due buckets.
+
+    One grouped query; returns (rows, totals) where each row is a dict with
+    client_id, client_name, total and one key per AGING_BUCKETS entry.
+    """
+    today = today or date.today()
+    balance = ClientInvoice.amount - ClientInvoice.amount_paid
+    due = ClientInvoice.due_date
+    limits = {
+        "current": due > today,
+        "0-30": and_(due <= today, due >= today - timedelta(days=30)),
+        "31-60": and_(due < today - timedelta(days=30), due >= today - timedelta(days=60)),
+        "61-90": and_(due < today - timedelta(days=60), due >= today - timedelta(days=90)),
+        "90+": due < today - timedelta(days=90),
+    }
+    query = db.session.query(
+        Client.id, Client.name, func.sum(balance),
+        *(func.sum(case((limits[b], balance), else_=0)) for b in AGING_BUCKETS)
+    ).join(Client, ClientInvoice.client_id == Client.id).filter(
+        ClientInvoice.status != "paid",
+        ClientInvoice.amount_paid < ClientInvoice.amount
+    ).group_by(Client.id, Client.name).order_by(func.sum(balance).desc())
+    rows = []
+    totals = dict.fromkeys(("total",) + AGING_BUCKETS, 0)
+    for client_id, name, total, *buckets in query:
+        row = {"client_id": client_id, "client_name": name, "total": total}
+        row.update(zip(AGING_BUCKETS, buckets))
+        for key in totals:
+            totals[key] += row[key]
+        rows.append(row)
+    return rows, totals
+# ----------------------
+# Retainer billing
+# ----------------------
+# A billing run invoices every active client's monthly retainer for one month
+# in a single transaction. The unique (client_id, month) index makes it
+# idempotent: clients already invoiced are skipped, and a concurrent run
+# cannot create a second invoice.
+def billing_due_date(month):
+    first = parse_month(month)
+    return min(first + timedelta(days=current_app.config["BILLING_DUE_DAY"] - 1), month_end(first))
+def plan_billing_run(month):
+    """Invoice rows a billing run for ``month`` would create, by client name."""
+    due_date = billing_due_date(month)
+    already_invoiced = select(ClientInvoice.id).where(
+        ClientInvoice.client_id == Client.id,
+        ClientInvoice.month == month
+    ).exists()
+    rows = db.session.query(Client.id, Client.name, Client.monthly_retainer).filter(
+        Client.status == "active",
+        Client.monthly_retainer > 0,
+        ~already_invoiced
+    ).order_by(Client.name)
+    return [{
+        "client_id": client_id,
+        "client_name": name,
+        "month": month,
+        "amount": retainer,
+        "due_date": due_date,
+    } for client_id, name, retainer in rows]
+def run_billing(month, dry_run=False):
+    """Create retainer invoices for ``month``; returns the planned rows."""
+    planned = plan_billing_run(month)
+    if dry_run or not planned:
+        return planned
+    db.session.execute(insert_ignoring_conflicts(ClientInvoice.__table__), [{
+        "client_id": row["client_id"],
+        "month": month,
+        "amount": row["amount"],
+        "due_date": row["due_date"],
+        "status": "pending",
+    } for row in planned])
+    queue_client_metrics(row["client_id"] for row in planned)
+    db.session.commit()
+    if planned[0]["due_date"] < date.today():
+        sweep_overdue(force=True)
+    return planned
@@ -0,0 +1,435 @@
+import re
+from flask import current_app, render_template
+from sqlalchemy import and_, func, or_
+from datetime import datetime, date, timedelta
+from markupsafe import Markup
+from .database import db, upsert_increment
+from .models import (
+    Client, ClientInvoice, ClientPayment, ContentItem, EffortLog, EffortRollup, LedgerRollup, PaymentOut,
+    Projection, RevenueRollup,
+)
+from .cache import cached_fragment, client_choices
+from .jobs import job_handler
+from .pagination import content_item_query, invoice_query
+from .scorecard import refresh_client_metrics
+# ----------------------
+# Projection engine
+# ----------------------
+def get_active_projection():
+    today = date.today()
+    return Projection.query.filter(
+        Projection.start_date <= today,
+        Projection.end_date >= today
+    ).first()
+def month_end(day):
+    """Last day of the month containing ``day``."""
+    next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+MONTH_PATTERN = re.compile(r"\d{4}-\d{2}")
+def parse_month(month):
+    """``date`` of the first day of a YYYY-MM string (ValueError if malformed).
+
+    Only the zero-padded form is accepted, as months are stored and compared
+    as text: "2026-1" would slip past the one-invoice-per-month index.
+    """
+    if not isinstance(month, str) or not MONTH_PATTERN.fullmatch(month):
+        raise ValueError("expected YYYY-MM, got %r" % (month,))
+    return datetime.strptime(month, "%Y-%m").date()
+# Progress is read from RevenueRollup for every whole month of a projection
+# period; only partial months at its edges fall back to the invoice table.
+def record_paid_invoice(inv):
+    """Add a newly paid invoice to the revenue rollups (caller commits)."""
+    upsert_increment(RevenueRollup, ("month", "client_id"), [{
+        "month": inv.due_date.strftime("%Y-%m"),
+        "client_id": inv.client_id,
+        "revenue": inv.amount,
+    }])
+def rebuild_revenue_rollups():
+    """Recompute every revenue rollup row from paid invoices (caller commits)."""
+    db.session.query(RevenueRollup).delete()
+    totals = {}
+    rows = db.session.query(
+        ClientInvoice.due_date, ClientInvoice.client_id, func.sum(ClientInvoice.amount)
+    ).filter(ClientInvoice.status == "paid").group_by(ClientInvoice.due_date, ClientInvoice.client_id)
+    for due_date, client_id, amount in rows:
+        key = (due_date.strftime("%Y-%m"), client_id)
+        totals[key] = totals.get(key, 0) + amount
+    db.session.bulk_insert_mappings(RevenueRollup, [
+        {"month": month, "client_id": client_id, "revenue": revenue}
+        for (month, client_id), revenue in totals.items()
+    ])
+    return len(totals)
+def _split_period(start, end):
+    """Split [start, end] into whole YYYY-MM months and leftover partial date ranges."""
+    months, partial = [], []
+    cursor = start
+    while cursor <= end:
+        last = month_end(cursor)
+        if cursor.day == 1 and last <= end:
+            months.append(cursor.strftime("%Y-%m"))
+        else:
+            partial.append((cursor, min(last, end)))
+        cursor = last + timedelta(days=1)
+    return months, partial
+def paid_revenue_by_client(start, end):
+    """{client_id: paid invoice amount} for invoices due between start and end."""
+    months, partial = _split_period(start, end)
+    revenue = {}
+    if months:
+        rows = db.session.query(RevenueRollup.client_id, func.sum(RevenueRollup.revenue)).filter(
+            RevenueRollup.month.in_(months)
+        ).group_by(RevenueRollup.client_id)
+        for client_id, amount in rows:
+            revenue[client_id] = revenue.get(client_id, 0) + amount
+    if partial:
+        rows = db.session.query(ClientInvoice.client_id, func.sum(ClientInvoice.amount)).filter(
+            ClientInvoice.status == "paid",
+            or_(*(ClientInvoice.due_date.between(a, b) for a, b in partial))
+        ).group_by(ClientInvoice.client_id)
+        for client_id, amount in rows:
+            revenue[client_id] = revenue.get(client_id, 0) + amount
+    return revenue
+def render_projection_card():
+    """HTML of the active projection's progress card."""
+    projection = get_active_projection()
+    return Markup(render_template(
+        "_projection_card.html",
+        projection=projection,
+        projection_progress=get_projection_progress(projection) if projection else None,
+    ))
+def get_projection_progress(projection):
+    """Paid revenue and paying clients against a projection's targets."""
+    revenue = paid_revenue_by_client(projection.start_date, projection.end_date)
+    achieved_revenue = sum(revenue.values())
+    achieved_clients = len(revenue)
+    revenue_pct = (achieved_revenue / projection.target_revenue * 100) if projection.target_revenue else 0
+    client_pct = (achieved_clients / projection.target_clients_count * 100) if projection.target_clients_count else 0
+    return {
+        "achieved_revenue": achieved_revenue,
+        "achieved_clients": achieved_clients,
+        "revenue_pct": round(revenue_pct, 1),
+        "client_pct": round(client_pct, 1)
+    }
+# ----------------------
+# Effort analytics
+# ----------------------
+# Every effort log is added to EffortRollup as it is written, so summaries,
+# time series and profitability read at most one row per client and day.
+EFFORT_GRANULARITIES = ("day", "week", "month")
+EFFORT_COUNTERS = ("minutes", "posts", "reels")
+def _effort_rollup_rows(logs):
+    """Sum effort log dicts (EffortLog column names) into rollup rows."""
+    totals = {}
+    for log in logs:
+        day = log["date"]
+        row = totals.get((day, log["client_id"]))
+        if row is None:
+            row = totals[day, log["client_id"]] = {
+                "day": day, "client_id": log["client_id"],
+                "week": day - timedelta(days=day.weekday()), "month": day.strftime("%Y-%m"),
+                "minutes": 0, "posts": 0, "reels": 0,
+            }
+        row["minutes"] += log.get("time_minutes") or 0
+        row["posts"] += log.get("posts_count") or 0
+        row["reels"] += log.get("reels_count") or 0
+    return list(totals.values())
+def record_effort_logs(logs):
+    """Add new effort logs (dicts or EffortLog rows) to the effort and ledger rollups (caller commits)."""
+    logs = [log if isinstance(log, dict) else {c.key: getattr(log, c.key) for c in EffortLog.__table__.columns}
+            for log in logs]
+    rollups = _effort_rollup_rows(logs)
+    upsert_increment(EffortRollup, ("day", "client_id"), rollups, counters=EFFORT_COUNTERS)
+    record_ledger(ledger_rows_for_effort(rollups))
+def rebuild_effort_rollups():
+    """Recompute every effort rollup row from the effort logs (caller commits)."""
+    db.session.query(EffortRollup).delete()
+    rows = db.session.query(
+        EffortLog.date, EffortLog.client_id,
+        func.sum(EffortLog.time_minutes), func.sum(EffortLog.posts_count), func.sum(EffortLog.reels_count),
+    ).group_by(EffortLog.date, EffortLog.client_id)
+    rollups = _effort_rollup_rows(
+        {"date": day, "client_id": client_id, "time_minutes": minutes, "posts_count": posts, "reels_count": reels}
+        for day, client_id, minutes, posts, reels in rows
+    )
+    db.session.bulk_insert_mappings(EffortRollup, rollups)
+    return len(rollups)
+def _effort_rollup_query(start, end, client_id=None):
+    query = db.session.query(EffortRollup).filter(EffortRollup.day >= start, EffortRollup.day <= end)
+    if client_id:
+        query = query.filter(EffortRollup.client_id == client_id)
+    return query
+EFFORT_PERIODS = {"week": "Last 7 days", "month": "This month", "quarter": "This quarter", "year": "This year"}
+def effort_period_start(period, today):
+    """First day of one of the EFFORT_PERIODS windows, which all end today."""
+    if period == "week":
+        return today - timedelta(days=7)
+    if period == "quarter":
+        return today.replace(month=(today.month - 1) // 3 * 3 + 1, day=1)
+    if period == "year":
+        return today.replace(month=1, day=1)
+    return today.replace(day=1)
+def effort_summary(start, end):
+    """Minutes per client between start and end, largest first, with their share of the total."""
+    rows = _effort_rollup_query(start, end).join(Client).with_entities(
+        Client.name, func.sum(EffortRollup.minutes)
+    ).group_by(Client.id, Client.name).all()
+    total_minutes = sum(minutes for _, minutes in rows)
+    summary = [{
+        "client_name": name,
+        "total_minutes": minutes,
+        "percentage": round(minutes / total_minutes * 100, 1) if total_minutes else 0,
+    } for name, minutes in rows]
+    return sorted(summary, key=lambda row: row["total_minutes"], reverse=True)
+def _effort_periods(start, end, granularity):
+    """Bucket keys covering start..end, matching EffortRollup.day/week/month."""
+    if granularity == "month":
+        periods, cursor = [], start.replace(day=1)
+        while cursor <= end:
+            periods.append(cursor.strftime("%Y-%m"))
+            cursor = month_end(cursor) + timedelta(days=1)
+        return periods
+    step = 7 if granularity == "week" else 1
+    first = start - timedelta(days=start.weekday()) if granularity == "week" else start
+    return [first + timedelta(days=n) for n in range(0, (end - first).days + 1, step)]
+def effort_series(start, end, granularity="day", client_id=None):
+    """Effort totals per day, week or month between start and end, per client.
+
+    Every period in the range is present, with zeros where nothing was logged.
+    """
+    bucket = getattr(EffortRollup, granularity)
+    rows = _effort_rollup_query(start, end, client_id).join(Client).with_entities(
+        bucket, EffortRollup.client_id, Client.name,
+        *(func.sum(getattr(EffortRollup, k)) for k in EFFORT_COUNTERS)
+    ).group_by(bucket, EffortRollup.client_id, Client.name).order_by(bucket, Client.name)
+    series = {
+        period: dict({"period": period, "clients": []}, **dict.fromkeys(EFFORT_COUNTERS, 0))
+        for period in _effort_periods(start, end, granularity)
+    }
+    for period, row_client_id, client_name, *counts in rows:
+        point = series[period]
+        point["clients"].append(dict({"client_id": row_client_id, "client_name": client_name},
+                                     **dict(zip(EFFORT_COUNTERS, counts))))
+        for key, count in zip(EFFORT_COUNTERS, counts):
+            point[key] += count
+    return list(series.values())
+def retainer_for_period(client, start, end):
+    """A client's monthly retainer prorated over the days of start..end it was a client."""
+    if not client.monthly_retainer:
+        return 0.0
+    if client.start_date and client.start_date > start:
+        start = client.start_date
+    total, cursor = 0.0, start
+    while cursor <= end:
+        last = month_end(cursor)
+        days = (min(last, end) - cursor).days + 1
+        total += client.monthly_retainer * days / last.day
+        cursor = last + timedelta(days=1)
+    return total
+def effort_profitability(start, end):
+    """Effort against retainer per client between start and end.
+
+    ``hourly_rate`` is the retainer earned per logged hour; ``margin`` takes
+    the hours at HOURLY_COST off the retainer. Clients with neither a retainer
+    nor logged effort are left out. Least profitable first.
+    """
+    minutes = dict(_effort_rollup_query(start, end).with_entities(
+        EffortRollup.client_id, func.sum(EffortRollup.minutes)
+    ).group_by(EffortRollup.client_id).all())
+    hourly_cost = current_app.config["HOURLY_COST"]
+    rows = []
+    for client in Client.query.order_by(Client.name):
+        retainer = retainer_for_period(client, start, end)
+        hours = (minutes.get(client.id) or 0) / 60
+        if not retainer and not hours:
+            continue
+        rows.append({
+            "client_id": client.id,
+            "client_name": client.name,
+            "hours": round(hours, 2),
+            "retainer": round(retainer, 2),
+            "hourly_rate": round(retainer / hours, 2) if hours else None,
+            "margin": round(retainer - hours * hourly_cost, 2),
+        })
+    return sorted(rows, key=lambda row: row["margin"])
+# ----------------------
+# Ledger
+# ----------------------
+# Every client payment, payment out and effort log is added to LedgerRollup
+# as it is written, so the P&L, category breakdown and client margins read a
+# few rows per month instead of the payment and effort tables. Effort is
+# kept in minutes and priced at HOURLY_COST when read. `flask rebuild-ledger`
+# recomputes it all.
+LEDGER_KEYS = ("month", "client_id", "category")
+LEDGER_CASH_IN = "client_payment"
+LEDGER_EFFORT = "effort"
+def ledger_rows_for_payments(payments, sign=1):
+    """Ledger deltas for ClientPayment rows (or dicts with the same keys)."""
+    return [{
+        "month": p["payment_date"].strftime("%Y-%m"), "client_id": p["client_id"], "category": LEDGER_CASH_IN,
+        "cash_in": sign * p["amount"], "cash_out": 0.0, "minutes": 0, "entries": sign,
+    } for p in (p if isinstance(p, dict) else {c.key: getattr(p, c.key) for c in p.__table__.columns}
+                for p in payments)]
+def ledger_rows_for_payments_out(payments, sign=1):
+    """Ledger deltas for PaymentOut rows (or dicts with the same keys)."""
+    return [{
+        "month": p["payment_date"].strftime("%Y-%m"), "client_id": p.get("related_client_id") or 0,
+        "category": p.get("category") or "others", "cash_in": 0.0, "cash_out": sign * p["amount"], "minutes": 0,
+        "entries": sign,
+    } for p in (p if isinstance(p, dict) else {c.key: getattr(p, c.key) for c in p.__table__.columns}
+                for p in payments)]
+def ledger_rows_for_effort(rollup_rows):
+    """Ledger deltas for EffortRollup rows, merged per month and client."""
+    totals = {}
+    for row in rollup_rows:
+        key = (row["month"], row["client_id"], LEDGER_EFFORT)
+        totals.setdefault(key, dict(zip(LEDGER_KEYS, key), cash_in=0.0, cash_out=0.0, minutes=0, entries=0))
+        totals[key]["minutes"] += row["minutes"] or 0
+    return list(totals.values())
+def record_ledger(rows):
+    """Add ledger deltas to the rollups (caller commits)."""
+    upsert_increment(LedgerRollup, LEDGER_KEYS, rows)
+def record_payment_out(**fields):
+    """Add a PaymentOut and its ledger entry (caller commits)."""
+    payment = PaymentOut(**fields)
+    db.session.add(payment)
+    record_ledger(ledger_rows_for_payments_out([fields]))
+    return payment
+def rebuild_ledger():
+    """Recompute every ledger rollup row from both payment tables (caller commits)."""
+    db.session.query(LedgerRollup).delete()
+    totals = {}
+    cash_in = db.session.query(
+        ClientPayment.payment_date, ClientPayment.client_id, func.sum(ClientPayment.amount), func.count()
+    ).group_by(ClientPayment.payment_date, ClientPayment.client_id)
+    cash_out = db.session.query(
+        PaymentOut.payment_date, PaymentOut.related_client_id, PaymentOut.category,
+        func.sum(PaymentOut.amount), func.count()
+    ).group_by(PaymentOut.payment_date, PaymentOut.related_client_id, PaymentOut.category)
+    rows = [(day, client_id, LEDGER_CASH_IN, amount, 0.0, count) for day, client_id, amount, count in cash_in]
+    rows += [(day, client_id or 0, category or "others", 0.0, amount, count)
+             for day, client_id, category, amount, count in cash_out]
+    for day, client_id, category, money_in, money_out, count in rows:
+        key = (day.strftime("%Y-%m"), client_id, category)
+        row = totals.setdefault(key, dict(zip(LEDGER_KEYS, key), cash_in=0.0, cash_out=0.0, minutes=0, entries=0))
+        row["cash_in"] += money_in
+        row["cash_out"] += money_out
+        row["entries"] += count
+    effort = ledger_rows_for_effort(
+        {"month": month, "client_id": client_id, "minutes": minutes}
+        for month, client_id, minutes in db.session.query(
+            EffortRollup.month, EffortRollup.client_id, func.sum(EffortRollup.minutes)
+        ).group_by(EffortRollup.month, EffortRollup.client_id)
+    )
+    db.session.bulk_insert_mappings(LedgerRollup, list(totals.values()) + effort)
+    return len(totals) + len(effort)
+def _ledger_query(start_month, end_month):
+    return db.session.query(LedgerRollup).filter(LedgerRollup.month >= start_month, LedgerRollup.month <= end_month)
+def _ledger_sums(column, start_month, end_month):
+    """{value: (cash in, cash out, effort cost)} per value of a LedgerRollup column."""
+    hourly_cost = current_app.config["HOURLY_COST"]
+    return {key: (money_in, money_out, minutes / 60 * hourly_cost) for key, money_in, money_out, minutes in
+            _ledger_query(start_month, end_month).with_entities(
+                column, func.sum(LedgerRollup.cash_in), func.sum(LedgerRollup.cash_out), func.sum(LedgerRollup.minutes)
+            ).group_by(column)}
+def ledger_months(start_month, end_month):
+    """YYYY-MM strings from start_month to end_month inclusive."""
+    months, cursor = [], parse_month(start_month)
+    while cursor.strftime("%Y-%m") <= end_month:
+        months.append(cursor.strftime("%Y-%m"))
+        cursor = month_end(cursor) + timedelta(days=1)
+    return months
+def ledger_pnl(start_month, end_month):
+    """Monthly cash in, cash out, effort cost and profit, gap-filled, with totals.
+
+    Returns (rows, totals); profit is cash in less cash out and effort cost.
+    """
+    sums = _ledger_sums(LedgerRollup.month, start_month, end_month)
+    rows = []
+    totals = dict.fromkeys(("cash_in", "cash_out", "net_cash", "effort_cost", "profit"), 0.0)
+    for month in ledger_months(start_month, end_month):
+        money_in, money_out, cost = sums.get(month, (0.0, 0.0, 0.0))
+        row = {
+            "month": month, "cash_in": round(money_in, 2), "cash_out": round(money_out, 2),
+            "net_cash": round(money_in - money_out, 2), "effort_cost": round(cost, 2),
+            "profit": round(money_in - money_out - cost, 2),
+        }
+        for key in totals:
+            totals[key] = round(totals[key] + row[key], 2)
+        rows.append(row)
+    return rows, totals
+def ledger_categories(start_month, end_month):
+    """Cash out per category, largest first."""
+    return [{"category": category, "cash_out": round(money_out, 2), "entries": entries}
+            for category, money_out, entries in _ledger_query(start_month, end_month)
+            .filter(LedgerRollup.category.notin_([LEDGER_CASH_IN, LEDGER_EFFORT]))
+            .with_entities(LedgerRollup.category, func.sum(LedgerRollup.cash_out), func.sum(LedgerRollup.entries))
+            .group_by(LedgerRollup.category).order_by(func.sum(LedgerRollup.cash_out).desc())]
+def ledger_client_margins(start_month, end_month):
+    """Per client: payments in, related payments out, effort cost and net margin. Lowest margin first."""
+    sums = _ledger_sums(LedgerRollup.client_id, start_month, end_month)
+    sums.pop(0, None)
+    names = {c["id"]: c["name"] for c in client_choices()}
+    rows = []
+    for client_id, (money_in, money_out, cost) in sums.items():
+        rows.append({
+            "client_id": client_id, "client_name": names.get(client_id, "#%d" % client_id),
+            "cash_in": round(money_in, 2), "cash_out": round(money_out, 2), "effort_cost": round(cost, 2),
+            "margin": round(money_in - money_out - cost, 2),
+        })
+    return sorted(rows, key=lambda row: (row["margin"], row["client_name"]))
+# ----------------------
+# Dashboard snapshot
+# ----------------------
+# Everyone lands on the dashboard many times a day, so its data is computed in
+# a handful of queries and cached per day for DASHBOARD_CACHE_TTL seconds,
+# keyed on the versions of the tables it reads like any other fragment.
+DASHBOARD_MODELS = (Client, ClientInvoice, ContentItem, EffortRollup, Projection, RevenueRollup)
+def snapshot_row(obj):
+    """Plain-dict copy of a row (and its client's name) that outlives the session."""
+    row = {c.key: getattr(obj, c.key) for c in obj.__table__.columns}
+    if "client_id" in row:
+        row["client"] = {"id": obj.client_id, "name": obj.client.name}
+    return row
+def build_dashboard_snapshot(today):
+    start_week = today - timedelta(days=3)
+    end_week = today + timedelta(days=3)
+    # Today's, this week's (simple: +/- 3 days) and overdue content in one pass
+    items = content_item_query().filter(or_(
+        and_(ContentItem.date >= start_week, ContentItem.date <= end_week),
+        ContentItem.status == "overdue"
+    )).order_by(ContentItem.date, ContentItem.id).all()
+    items = [snapshot_row(i) for i in items]
+    weeks_items = [i for i in items if start_week <= i["date"] <= end_week]
+    todays_items = sorted((i for i in weeks_items if i["date"] == today), key=lambda i: i["client_id"])
+    overdue_items = [i for i in items if i["status"] == "overdue"]
+    overdue_invoices = invoice_query().filter_by(status="overdue").order_by(ClientInvoice.due_date).all()
+    # Effort summary: last 30 days
+    effort_summary_sorted = effort_summary(today - timedelta(days=30), today)
+    projection = get_active_projection()
+    return {
+        "todays_items": todays_items,
+        "weeks_items": weeks_items,
+        "overdue_items": overdue_items,
+        "overdue_invoices": [snapshot_row(inv) for inv in overdue_invoices],
+        "top_client": effort_summary_sorted[0] if effort_summary_sorted else None,
+        "effort_summary": effort_summary_sorted,
+        "projection": snapshot_row(projection) if projection else None,
+        "projection_progress": get_projection_progress(projection) if projection else None,
+    }
+def get_dashboard_snapshot():
+    return cached_fragment("dashboard", DASHBOARD_MODELS, lambda: build_dashboard_snapshot(date.today()),
+                           ttl=current_app.config["DASHBOARD_CACHE_TTL"])
+# ----------------------
+# Rollup jobs
+# ----------------------
+@job_handler("effort_rollup")
+def effort_rollup_job(log):
+    """Add one effort log, as it was when queued, to the rollups and its client's scorecard."""
+    record_effort_logs([dict(log, date=date.fromisoformat(log["date"]))])
+    refresh_client_metrics([log["client_id"]])
+@job_handler("revenue_rollup")
+def revenue_rollup_job(month, client_id, amount):
+    upsert_increment(RevenueRollup, ("month", "client_id"), [{"month": month, "client_id": client_id, "revenue": amount}])
+@job_handler("ledger_rollup")
+def ledger_rollup_job(rows):
+    record_ledger(rows)
@@ -0,0 +1,353 @@
+from flask import Blueprint, abort, current_app, request
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Bundle
+from werkzeug.exceptions import HTTPException
+from .database import db, upsert_increment
+from .models import (
+    CONTENT_STATUSES, TASK_STATUSES, Client, ClientInvoice, ClientPayment, ContentItem, EffortLog, Employee,
+    PaymentOut, Projection, RevenueRollup, Task, set_status,
+)
+from .pagination import keyset_page
+from .scorecard import queue_client_metrics
+from .scheduler import queue_overdue_check
+from .analytics import ledger_rows_for_payments_out, record_effort_logs, record_ledger
+from .accounts import record_payment
+from .imports import choice_field, date_field, float_field, int_field, month_field, text_field
+from .planner import json_response
+# ----------------------
+# JSON API
+# ----------------------
+# /api/<resource> lists rows (GET), batch-creates them (POST, a list of
+# objects) and batch-updates them (PATCH, a list of objects with "id"). A
+# batch is one transaction: if any row is invalid nothing is written and the
+# response lists every row error. ?fields=a,b limits the columns selected.
+api = Blueprint("api", __name__, url_prefix="/api")
+API_MAX_LIMIT = 500
+# resource: (model, {column: (parser, required)}); columns not listed (ids,
+# timestamps, amount_paid) are read-only
+API_RESOURCES = {
+    "clients": (Client, {
+        "name": (text_field, True),
+        "brand_name": (text_field, False),
+        "start_date": (date_field, False),
+        "monthly_retainer": (float_field, False),
+        "status": (choice_field("active", "paused", "closed"), False),
+        "notes": (text_field, False),
+    }),
+    "content": (ContentItem, {
+        "client_id": (int_field, True),
+        "date": (date_field, True),
+        "platform": (text_field, False),
+        "content_type": (text_field, False),
+        "title": (text_field, False),
+        "caption": (text_field, False),
+        "status": (choice_field(*CONTENT_STATUSES), False),
+        "posted_url": (text_field, False),
+        "remarks": (text_field, False),
+    }),
+    "efforts": (EffortLog, {
+        "client_id": (int_field, True),
+        "date": (date_field, True),
+        "posts_count": (int_field, False),
+        "reels_count": (int_field, False),
+        "time_minutes": (int_field, False),
+        "notes": (text_field, False),
+        "employee_id": (int_field, False),
+    }),
+    "employees": (Employee, {
+        "name": (text_field, True),
+        "role": (text_field, False),
+        "email": (text_field, False),
+        "status": (choice_field("active", "inactive"), False),
+        "weekly_capacity_hours": (float_field, False),
+    }),
+    "tasks": (Task, {
+        "title": (text_field, True),
+        "description": (text_field, False),
+        "client_id": (int_field, False),
+        "assigned_to": (int_field, False),
+        "status": (choice_field(*TASK_STATUSES), False),
+        "priority": (choice_field("low", "medium", "high"), False),
+        "due_date": (date_field, False),
+    }),
+    # Invoices become paid through payments, never by setting the status
+    "invoices": (ClientInvoice, {
+        "client_id": (int_field, True),
+        "month": (month_field, True),
+        "amount": (float_field, True),
+        "due_date": (date_field, True),
+        "status": (choice_field("pending", "overdue"), False),
+    }),
+    # Payments are create-only and go through record_payment()
+    "payments": (ClientPayment, {
+        "invoice_id": (int_field, True),
+        "amount": (float_field, True),
+        "payment_date": (date_field, True),
+        "mode": (text_field, False),
+        "reference": (text_field, False),
+        "notes": (text_field, False),
+    }),
+    "payments-out": (PaymentOut, {
+        "vendor_name": (text_field, True),
+        "related_client_id": (int_field, False),
+        "amount": (float_field, True),
+        "payment_date": (date_field, True),
+        "mode": (text_field, False),
+        "category": (text_field, False),
+        "notes": (text_field, False),
+    }),
+    "projections": (Projection, {
+        "period_type": (choice_field("monthly", "quarterly", "yearly"), False),
+        "start_date": (date_field, True),
+        "end_date": (date_field, True),
+        "target_revenue": (float_field, True),
+        "target_clients_count": (int_field, True),
+        "description": (text_field, False),
+    }),
+}
+API_STATUS_RESOURCES = {"content": CONTENT_STATUSES, "tasks": TASK_STATUSES}
+# Resources whose rows can be written already past due, and get the overdue job for it
+OVERDUE_RESOURCES = ("content", "invoices", "tasks")
+# Resources whose writes queue a refresh of the affected clients' scorecards
+SCORECARD_RESOURCES = ("clients", "content", "efforts", "invoices", "payments")
+class ApiBatchError(Exception):
+    """A batch was rejected; ``errors`` holds {"index", "error"} per bad row."""
+    def __init__(self, errors):
+        super().__init__("%d invalid rows" % len(errors))
+        self.errors = errors
+@api.errorhandler(HTTPException)
+def api_http_error(exc):
+    return json_response({"error": exc.description}, exc.code)
+@api.errorhandler(ApiBatchError)
+def api_batch_error(exc):
+    db.session.rollback()
+    return json_response({"error": "No rows were written.", "errors": exc.errors}, 400)
+@api.errorhandler(IntegrityError)
+def api_integrity_error(exc):
+    db.session.rollback()
+    return json_response({"error": "No rows were written: %s" % exc.orig}, 409)
+def _api_resource(resource):
+    if resource not in API_RESOURCES:
+        abort(404, "Unknown resource %r" % resource)
+    return API_RESOURCES[resource]
+def _api_columns(model):
+    """Table columns named by ?fields= (all by default); id is always included."""
+    columns = model.__table__.columns
+    fields = [f.strip() for f in request.args.get("fields", "").split(",") if f.strip()]
+    unknown = [f for f in fields if f not in columns]
+    if unknown:
+        abort(400, "Unknown fields: %s" % ", ".join(unknown))
+    return [columns.id] + [columns[f] for f in dict.fromkeys(fields) if f != "id"] if fields else list(columns)
+def _api_row(obj):
+    return {c.key: getattr(obj, c.key) for c in obj.__table__.columns}
+def _api_batch():
+    records = request.get_json(silent=True)
+    if isinstance(records, dict):
+        records = [records]
+    if not isinstance(records, list) or not records:
+        abort(400, "Send a JSON object or a non-empty list of objects.")
+    if len(records) > current_app.config["API_BATCH_LIMIT"]:
+        abort(413, "At most %d rows per request." % current_app.config["API_BATCH_LIMIT"])
+    return records
+def _parse_api_record(record, spec, partial=False):
+    """Validated column values from one request object.
+
+    On create a missing or null optional field takes the column default; with
+    ``partial`` (updates) only the given fields are returned and null clears one.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("expected an object")
+    unknown = set(record) - set(spec) - {"id"}
+    if unknown:
+        raise ValueError("unknown or read-only fields: %s" % ", ".join(sorted(unknown)))
+    row = {}
+    for column, (parse, required) in spec.items():
+        if column not in record:
+            if required and not partial:
+                raise ValueError("%s is required" % column)
+            continue
+        value = record[column]
+        if value is None and not partial and not required:
+            continue
+        try:
+            row[column] = None if value is None or value == "" else parse(value)
+        except ValueError as exc:
+            raise ValueError("%s: %s" % (column, exc))
+        if required and row[column] is None:
+            raise ValueError("%s is required" % column)
+    return row
+def _check_references(model, rows, errors):
+    """Add an error for every row pointing at a client/employee/invoice that does not exist."""
+    for column in model.__table__.columns:
+        if not column.foreign_keys:
+            continue
+        wanted = {row[column.key] for _, row in rows if row.get(column.key) is not None}
+        if not wanted:
+            continue
+        target = next(iter(column.foreign_keys)).column
+        found = {value for value, in db.session.query(target).filter(target.in_(wanted))}
+        for index, row in rows:
+            if row.get(column.key) not in found | {None}:
+                errors.append({"index": index, "error": "unknown %s %s" % (column.key, row[column.key])})
+def _negated_effort(log):
+    row = _api_row(log)
+    for column in ("time_minutes", "posts_count", "reels_count"):
+        row[column] = -(row[column] or 0)
+    return row
+def _paid_revenue_delta(invoice, sign):
+    upsert_increment(RevenueRollup, ("month", "client_id"), [{
+        "month": invoice.due_date.strftime("%Y-%m"),
+        "client_id": invoice.client_id,
+        "revenue": sign * invoice.amount,
+    }])
+def _create_rows(resource, model, rows):
+    """Insert parsed rows, keeping the rollups in step (caller commits)."""
+    if resource == "payments":
+        invoices = {inv.id: inv for inv in ClientInvoice.query.filter(
+            ClientInvoice.id.in_({row["invoice_id"] for row in rows}))}
+        objs = [record_payment(invoices[row.pop("invoice_id")], **row)[0] for row in rows]
+    else:
+        objs = [model(**row) for row in rows]
+        db.session.add_all(objs)
+        if resource == "efforts":
+            record_effort_logs(objs)
+        elif resource == "payments-out":
+            record_ledger(ledger_rows_for_payments_out(rows))
+    db.session.flush()
+    if resource in OVERDUE_RESOURCES:
+        for obj in objs:
+            queue_overdue_check(obj)
+    queue_client_metrics(_scorecard_clients(resource, objs))
+    return objs
+def _update_row(resource, obj, changes):
+    """Apply parsed changes to one row, keeping the rollups in step (caller commits)."""
+    if resource == "invoices":
+        if (obj.status == "paid" or obj.amount_paid) and "amount" in changes and changes["amount"] != obj.amount:
+            raise ValueError("amount cannot change once the invoice is paid or has payments")
+        if obj.status == "paid" and "status" in changes:
+            raise ValueError("status of a paid invoice cannot change")
+        if obj.status == "paid" and "client_id" in changes and changes["client_id"] != obj.client_id:
+            raise ValueError("client of a paid invoice cannot change")
+    if resource == "efforts":
+        record_effort_logs([_negated_effort(obj)])
+    elif resource == "payments-out":
+        record_ledger(ledger_rows_for_payments_out([obj], -1))
+    paid = resource == "invoices" and obj.status == "paid"
+    if paid:
+        _paid_revenue_delta(obj, -1)
+    for column, value in changes.items():
+        setattr(obj, column, value)
+    if resource == "efforts":
+        record_effort_logs([obj])
+    elif resource == "payments-out":
+        record_ledger(ledger_rows_for_payments_out([obj]))
+    if paid:
+        _paid_revenue_delta(obj, 1)
+def _scorecard_clients(resource, objs):
+    """Clients whose scorecard the written ``objs`` feed, if ``resource`` is one it reads."""
+    if resource not in SCORECARD_RESOURCES:
+        return []
+    return [obj.id if resource == "clients" else obj.client_id for obj in objs]
+@api.route("/<resource>")
+def api_list(resource):
+    """One page of rows ordered by id; other query args filter on equal column values."""
+    model, spec = _api_resource(resource)
+    query = db.session.query(Bundle("row", *_api_columns(model)))
+    for key, value in request.args.items():
+        if key in ("fields", "after", "limit"):
+            continue
+        if key not in model.__table__.columns:
+            abort(400, "Cannot filter on %r" % key)
+        parse = spec[key][0] if key in spec else int_field
+        try:
+            query = query.filter(model.__table__.columns[key] == parse(value))
+        except ValueError as exc:
+            abort(400, "%s: %s" % (key, exc))
+    limit = min(request.args.get("limit", current_app.config["PAGE_SIZE"], type=int), API_MAX_LIMIT)
+    rows, next_after = keyset_page(query, [(model.id, False)], request.args.get("after"), max(limit, 1))
+    return json_response({"data": [dict(row._mapping) for row in rows], "next": next_after})
+@api.route("/<resource>/<int:obj_id>")
+def api_get(resource, obj_id):
+    model, _ = _api_resource(resource)
+    row = db.session.query(Bundle("row", *_api_columns(model))).filter(model.id == obj_id).first()
+    if row is None:
+        abort(404, "No %s with id %d" % (resource, obj_id))
+    return json_response({"data": dict(row[0]._mapping)})
+@api.route("/<resource>", methods=["POST"])
+def api_create(resource):
+    model, spec = _api_resource(resource)
+    rows, errors = [], []
+    for index, record in enumerate(_api_batch()):
+        try:
+            rows.append((index, _parse_api_record(record, spec)))
+        except ValueError as exc:
+            errors.append({"index": index, "error": str(exc)})
+    _check_references(model, rows, errors)
+    if resource == "payments":
+        errors += [{"index": i, "error": "amount must be positive"} for i, row in rows if row["amount"] <= 0]
+    if errors:
+        raise ApiBatchError(sorted(errors, key=lambda e: e["index"]))
+    data = [_api_row(obj) for obj in _create_rows(resource, model, [row for _, row in rows])]
+    db.session.commit()
+    return json_response({"data": data}, 201)
+@api.route("/<resource>", methods=["PATCH"])
+@api.route("/<resource>/<int:obj_id>", methods=["PATCH"])
+def api_update(resource, obj_id=None):
+    model, spec = _api_resource(resource)
+    if resource == "payments":
+        abort(405, description="Payments cannot be changed; record a correcting payment instead.")
+    records = _api_batch()
+    if obj_id is not None:
+        if len(records) != 1 or not isinstance(records[0], dict):
+            abort(400, "Send one object.")
+        records = [dict(records[0], id=obj_id)]
+    ids = {r.get("id") for r in records if isinstance(r, dict) and isinstance(r.get("id"), int)}
+    objs = {obj.id: obj for obj in model.query.filter(model.id.in_(ids))}
+    rows, errors = [], []
+    for index, record in enumerate(records):
+        try:
+            changes = _parse_api_record(record, spec, partial=True)
+            obj = objs.get(record.get("id"))
+            if obj is None:
+                raise ValueError("no %s with id %r" % (resource, record.get("id")))
+            rows.append((index, obj, changes))
+        except ValueError as exc:
+            errors.append({"index": index, "error": str(exc)})
+    _check_references(model, [(index, changes) for index, _, changes in rows], errors)
+    scorecards = _scorecard_clients(resource, [obj for _, obj, _ in rows])
+    if not errors:
+        for index, obj, changes in rows:
+            try:
+                _update_row(resource, obj, changes)
+            except ValueError as exc:
+                errors.append({"index": index, "error": str(exc)})
+    if errors:
+        raise ApiBatchError(sorted(errors, key=lambda e: e["index"]))
+    db.session.flush()
+    if resource in OVERDUE_RESOURCES:
+        for _, obj, _ in rows:
+            queue_overdue_check(obj)
+    queue_client_metrics(scorecards + _scorecard_clients(resource, [obj for _, obj, _ in rows]))
+    data = [_api_row(obj) for _, obj, _ in rows]
+    db.session.commit()
+    return json_response({"data": data})
+@api.route("/<resource>/status", methods=["POST"])
+def api_set_status(resource):
+    """Set one status on many content items or tasks: {"ids": [...], "status": "..."}."""
+    if resource not in API_STATUS_RESOURCES:
+        abort(404, "Statuses can be set in bulk on: %s" % ", ".join(API_STATUS_RESOURCES))
+    model = API_RESOURCES[resource][0]
+    body = request.get_json(silent=True) or {}
+    ids, status = body.get("ids"), body.get("status")
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+        abort(400, "ids must be a non-empty list of integers.")
+    if len(ids) > current_app.config["API_BATCH_LIMIT"]:
+        abort(413, "At most %d ids per request." % current_app.config["API_BATCH_LIMIT"])
+    if status not in API_STATUS_RESOURCES[resource]:
+        abort(400, "status must be one of %s" % ", ".join(API_STATUS_RESOURCES[resource]))
+    found = {i for i, in db.session.query(model.id).filter(model.id.in_(ids))}
+    updated = set_status(model, found, status) if found else 0
+    if resource in SCORECARD_RESOURCES and found:
+        queue_client_metrics(c for c, in db.session.query(model.client_id).filter(model.id.in_(found)))
+    db.session.commit()
+    return json_response({"updated": updated, "missing": sorted(set(ids) - found)})
@@ -0,0 +1,309 @@
+import json
+import os
+import time
+import click
+from flask import current_app, url_for
+from sqlalchemy import event, func
+from datetime import datetime, date, timedelta
+from .database import db
+from .models import (
+    Client, ClientInvoice, ClientPayment, ContentItem, EffortLog, Employee, PaymentOut, Projection, Task,
+)
+from .scorecard import refresh_client_metrics
+from .analytics import month_end, rebuild_effort_rollups, rebuild_ledger, rebuild_revenue_rollups
+from .accounts import billing_due_date
+from .exports import EXPORTS
+from .api import API_RESOURCES
+# ----------------------
+# Synthetic data and route benchmarks
+# ----------------------
+# `flask seed` fills an empty database with a deterministic data set of
+# realistic volume; `flask bench-routes` then times every read-only route
+# through the test client and writes the results to JSON for comparison.
+SEED_NAMES = (
+    ("Sunrise", "Blue Lotus", "Urban", "Golden", "Green Leaf", "Silverline", "Royal", "Happy Paws", "Bright",
+     "Fresh", "Coastal", "Metro", "Evergreen", "Summit", "Spice Route", "Northstar", "Harbor", "Maple"),
+    ("Bakery", "Dental", "Fitness", "Studio", "Cafe", "Realty", "Boutique", "Motors", "Clinic", "Academy",
+     "Interiors", "Travels", "Foods", "Salon", "Apparel", "Events", "Pharma", "Jewellers"),
+)
+SEED_TOPICS = (
+    "Festive offer", "Customer story", "Behind the scenes", "Product launch", "Tips and tricks", "Team spotlight",
+    "Weekend sale", "How-to", "FAQ", "Testimonial", "New arrivals", "Giveaway", "Throwback", "Event recap",
+)
+SEED_VENDORS = (
+    ("Adobe", "software"), ("Canva", "software"), ("Meta Ads", "ads"), ("Google Ads", "ads"),
+    ("Freelance editor", "others"), ("Payroll", "salary"), ("Stock photos", "software"),
+)
+def _chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+def seed_demo_data(clients=500, content=200000, efforts=100000, invoices=50000, tasks=20000, seed=42, today=None):
+    """Fill an empty database with synthetic agency data (caller commits).
+
+    The same arguments always produce the same rows. Invoices are one per
+    client and month with matching payments and amount_paid, and the rollups
+    and client scorecards are rebuilt at the end. Returns {table: rows}.
+    """
+    import random
+    rnd = random.Random(seed)
+    today = today or date.today()
+    counts = {}
+    def insert(model, rows):
+        for chunk in _chunked(rows, 5000):
+            db.session.execute(model.__table__.insert(), chunk)
+            counts[model.__tablename__] = counts.get(model.__tablename__, 0) + len(chunk)
+    def day_between(first, last):
+        return first + timedelta(days=rnd.randint(0, max((last - first).days, 0)))
+    first_day = today - timedelta(days=3 * 365)
+    roster = []
+    for i in range(1, clients + 1):
+        start = day_between(first_day, today - timedelta(days=30))
+        retainer = rnd.randrange(15000, 150001, 500)
+        status = rnd.choices(("active", "paused", "closed"), (85, 8, 7))[0]
+        name = "%s %s" % (rnd.choice(SEED_NAMES[0]), rnd.choice(SEED_NAMES[1]))
+        roster.append((i, start, retainer))
+        counts.setdefault("_names", []).append({
+            "id": i, "name": "%s %d" % (name, i), "brand_name": name, "start_date": start,
+            "monthly_retainer": retainer, "status": status,
+        })
+    insert(Client, counts.pop("_names"))
+    # One employee per two clients; most on the default weekly capacity
+    employees = max(clients // 2, 1)
+    insert(Employee, ({
+        "id": i, "name": "Employee %d" % i, "role": rnd.choice(("Designer", "Copywriter", "Strategist", "Editor")),
+        "weekly_capacity_hours": rnd.choice((None, None, None, 20, 30)),
+    } for i in range(1, employees + 1)))
+    def content_rows():
+        for _ in range(content):
+            client_id, start, _ = rnd.choice(roster)
+            day = day_between(start, today + timedelta(days=60))
+            kind = rnd.choices(("post", "reel", "story", "blog", "email"), (40, 30, 15, 10, 5))[0]
+            if day > today:
+                status = "planned"
+            else:
+                status = rnd.choices(("done", "skipped", "overdue"), (80, 8, 12))[0]
+            yield {
+                "client_id": client_id, "date": day, "content_type": kind,
+                "platform": rnd.choice(("instagram", "facebook", "linkedin", "youtube", "x")),
+                "title": "%s %s" % (rnd.choice(SEED_TOPICS), kind), "status": status,
+                "updated_at": datetime.combine(min(day, today), datetime.min.time()),
+            }
+    insert(ContentItem, content_rows())
+    def effort_rows():
+        for _ in range(efforts):
+            client_id, start, _ = rnd.choice(roster)
+            yield {
+                "client_id": client_id, "date": day_between(start, today),
+                "posts_count": rnd.randint(0, 4), "reels_count": rnd.randint(0, 2),
+                "time_minutes": rnd.randrange(15, 241, 5), "employee_id": rnd.randint(1, employees),
+            }
+    insert(EffortLog, effort_rows())
+    # One invoice per client per month, walking back from this month
+    payments = []
+    def invoice_rows():
+        months_back = -(-invoices // max(clients, 1))
+        this_month = today.replace(day=1)
+        invoice_id = 0
+        for offset in range(months_back):
+            month_start = this_month
+            for _ in range(offset):
+                month_start = (month_start - timedelta(days=1)).replace(day=1)
+            month = month_start.strftime("%Y-%m")
+            due = billing_due_date(month)
+            for client_id, _, retainer in roster:
+                if invoice_id == invoices:
+                    return
+                invoice_id += 1
+                if due < today - timedelta(days=45):
+                    status = rnd.choices(("paid", "overdue"), (95, 5))[0]
+                elif due < today:
+                    status = rnd.choices(("paid", "overdue"), (60, 40))[0]
+                else:
+                    status = "pending"
+                if status == "paid":
+                    parts = [retainer] if rnd.random() < 0.85 else [retainer / 2, retainer / 2]
+                elif rnd.random() < 0.25:
+                    parts = [round(retainer * rnd.uniform(0.3, 0.7), 2)]
+                else:
+                    parts = []
+                for part in parts:
+                    payments.append({
+                        "client_id": client_id, "invoice_id": invoice_id, "amount": part,
+                        "payment_date": min(due + timedelta(days=rnd.randint(-5, 30)), today),
+                        "mode": rnd.choice(("bank_transfer", "upi", "card", "cash")),
+                    })
+                yield {
+                    "id": invoice_id, "client_id": client_id, "month": month, "amount": float(retainer),
+                    "due_date": due, "status": status, "amount_paid": float(sum(parts)),
+                }
+    insert(ClientInvoice, invoice_rows())
+    insert(ClientPayment, payments)
+    insert(PaymentOut, ({
+        "vendor_name": vendor, "category": category, "amount": float(rnd.randrange(500, 50001, 100)),
+        "payment_date": day_between(first_day, today), "mode": rnd.choice(("bank_transfer", "upi", "card")),
+        "related_client_id": rnd.choice(roster)[0] if category == "ads" else None,
+    } for vendor, category in (rnd.choice(SEED_VENDORS) for _ in range(invoices // 10))))
+    def task_rows():
+        for i in range(tasks):
+            due = day_between(today - timedelta(days=180), today + timedelta(days=60))
+            if due < today:
+                status = rnd.choices(("completed", "overdue", "in_progress"), (70, 20, 10))[0]
+            else:
+                status = rnd.choices(("pending", "in_progress"), (70, 30))[0]
+            yield {
+                "title": "%s: %s" % (rnd.choice(("Design", "Write", "Schedule", "Review", "Shoot")), rnd.choice(SEED_TOPICS)),
+                "client_id": rnd.choice(roster)[0] if rnd.random() < 0.9 else None,
+                "assigned_to": rnd.randint(1, employees), "status": status, "due_date": due,
+                "priority": rnd.choices(("low", "medium", "high"), (25, 55, 20))[0],
+            }
+    insert(Task, task_rows())
+    quarter_start = today.replace(month=(today.month - 1) // 3 * 3 + 1, day=1)
+    insert(Projection, [{
+        "period_type": "quarterly", "start_date": quarter_start,
+        "end_date": month_end(quarter_start.replace(month=quarter_start.month + 2)),
+        "target_revenue": float(sum(r for _, _, r in roster) * 3), "target_clients_count": clients,
+    }])
+    rebuild_revenue_rollups()
+    rebuild_effort_rollups()
+    rebuild_ledger()
+    refresh_client_metrics(today=today)
+    return counts
+# Extra query strings benchmarked per endpoint, on top of the bare route
+BENCH_QUERY_ARGS = {
+    "main.planner": [{"view": "week"}, {"view": "range", "start": "-90", "end": "0"}],
+    "main.planner_calendar_json": [{"view": "week"}],
+    "main.efforts": [{"period": "year"}],
+    "main.effort_series_json": [{"granularity": "month", "start": "-365"}],
+    "main.tasks": [{"status": "overdue"}],
+    "main.clients": [{"sort": "delivery"}, {"sort": "outstanding"}],
+    "main.workload": [{"view": "month"}],
+    "main.accounts": [{"status": "overdue"}],
+    "main.search": [{"q": "bakery"}, {"q": "festive offer"}],
+    "main.export": [{"start": "-30"}],
+    "api.api_list": [{"fields": "id", "limit": "200"}],
+}
+def bench_paths():
+    """(endpoint, path) for every GET route that does not write, ids filled from the database.
+
+    start/end in BENCH_QUERY_ARGS are days relative to today ("-30").
+    """
+    first_id = lambda model: db.session.query(func.min(model.id)).scalar() or 1
+    values = {
+        "client_id": [first_id(Client)], "item_id": [first_id(ContentItem)],
+        "invoice_id": [first_id(ClientInvoice)], "task_id": [first_id(Task)],
+        "kind": sorted(EXPORTS), "fmt": ["csv"], "resource": sorted(API_RESOURCES),
+    }
+    today = date.today()
+    def resolve(args):
+        return {k: (today + timedelta(days=int(v))).isoformat() if k in ("start", "end") else v
+                for k, v in args.items()}
+    paths = []
+    for rule in sorted(current_app.url_map.iter_rules(), key=lambda r: r.rule):
+        view = current_app.view_functions[rule.endpoint]
+        if "GET" not in rule.methods or rule.endpoint == "static" or getattr(view, "writes_on_get", False):
+            continue
+        combos = [{}]
+        for arg in sorted(rule.arguments - {"obj_id"}):
+            if arg not in values:
+                click.echo("Skipping %s: no benchmark value for <%s>" % (rule.rule, arg), err=True)
+                combos = []
+            combos = [dict(c, **{arg: v}) for c in combos for v in values.get(arg, ())]
+        for combo in combos:
+            if "obj_id" in rule.arguments:
+                combo["obj_id"] = first_id(API_RESOURCES[combo["resource"]][0])
+            for extra in [{}] + BENCH_QUERY_ARGS.get(rule.endpoint, []):
+                with current_app.test_request_context():
+                    paths.append((rule.endpoint, url_for(rule.endpoint, **combo, **resolve(extra))))
+    return paths
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+def bench_routes(paths, repeat=20, warmup=2):
+    """Time each path through the test client; yields one result dict per path."""
+    client = current_app.test_client()
+    statements = [0]
+    def count_statement(*args):
+        statements[0] += 1
+    event.listen(db.engine, "after_cursor_execute", count_statement)
+    try:
+        for endpoint, path in paths:
+            timings, queries, status = [], 0, None
+            for i in range(warmup + repeat):
+                statements[0] = 0
+                started = time.perf_counter()
+                resp = client.get(path)
+                resp.get_data()
+                elapsed = (time.perf_counter() - started) * 1000
+                status = resp.status_code
+                if i >= warmup:
+                    timings.append(elapsed)
+                    queries = max(queries, statements[0])
+            timings.sort()
+            yield {
+                "endpoint": endpoint, "path": path, "status": status, "queries": queries,
+                "p50_ms": round(percentile(timings, 50), 3), "p90_ms": round(percentile(timings, 90), 3),
+                "p99_ms": round(percentile(timings, 99), 3), "max_ms": round(timings[-1], 3),
+                "mean_ms": round(sum(timings) / len(timings), 3),
+            }
+    finally:
+        event.remove(db.engine, "after_cursor_execute", count_statement)
+# `flask bench-startup` loads the app in fresh interpreters and times what a
+# gunicorn worker pays before its first response: importing the code, creating
+# the app and serving one request, and, for --preload, forking a worker from
+# an already loaded master instead.
+STARTUP_PROBE = r"""
+import importlib, json, os, resource, sys, time
+target, path = sys.argv[1:3]
+sys.path.insert(0, path)
+module_name, _, attr = target.partition(":")
+started = time.perf_counter()
+module = importlib.import_module(module_name)
+imported = time.perf_counter()
+app = getattr(module, attr or "app")
+if not hasattr(app, "wsgi_app"):
+    app = app()
+created = time.perf_counter()
+def first_request():
+    return app.test_client().get("/").status_code
+reader, writer = os.pipe()
+forked = time.perf_counter()
+if os.fork() == 0:
+    with app.app_context():
+        for engine in app.extensions["sqlalchemy"].engines.values():
+            engine.dispose(close=False)
+    status = first_request()
+    os.write(writer, json.dumps([(time.perf_counter() - forked) * 1000, status]).encode())
+    os._exit(0)
+os.close(writer)
+fork_ms, fork_status = json.loads(os.read(reader, 4096))
+os.wait()
+served = time.perf_counter()
+status = first_request()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_ms": (created - imported) * 1000,
+    "first_request_ms": (time.perf_counter() - served) * 1000,
+    "cold_total_ms": (time.perf_counter() - started) * 1000 - (served - created),
+    "forked_worker_ms": fork_ms,
+    "modules": len(sys.modules),
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "status": max(status, fork_status),
+}))
+"""
+def bench_startup(target, path, repeat=10):
+    """Run STARTUP_PROBE ``repeat`` times; returns {measure: sorted samples}."""
+    import subprocess
+    import sys
+    env = dict(os.environ, SWEEPER_INTERVAL="0", JOB_WORKER="0")
+    samples = {}
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", STARTUP_PROBE, target, path], env=env, cwd=path,
+                             capture_output=True, text=True, check=True).stdout
+        for key, value in json.loads(out.splitlines()[-1]).items():
+            samples.setdefault(key, []).append(value)
+    return {key: sorted(values) for key, values in samples.items()}
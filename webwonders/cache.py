@@ -0,0 +1,216 @@
+import base64
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from flask import Response, current_app, make_response, request, session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from datetime import date, datetime
+from collections import OrderedDict
+from .database import db
+from .models import Client, Employee
+# ----------------------
+# Response cache
+# ----------------------
+# Pages and fragments are cached under keys that carry a version counter for
+# every table they read. Each committed INSERT/UPDATE/DELETE bumps its
+# table's counter, so the next request builds a new key and the stale entry
+# simply ages out of the LRU. Page ETags are derived from the same key, so
+# browsers revalidating an unchanged page get a 304 without a render.
+class MemoryCache:
+    """LRU cache in this worker's memory; other workers do not see its table versions."""
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.versions = {}
+        self.lock = threading.Lock()
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    def table_versions(self, tables):
+        return tuple(self.versions.get(t, 0) for t in tables)
+    def bump(self, tables):
+        with self.lock:
+            for table in tables:
+                self.versions[table] = self.versions.get(table, 0) + 1
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    raise TypeError("cannot cache %r" % type(value).__name__)
+def _decode(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    if "__date__" in obj:
+        return date.fromisoformat(obj["__date__"])
+    if "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+class SQLiteCache:
+    """Cache in a SQLite file shared by every worker process on the host.
+
+    Values are stored as JSON (dates and bytes tagged), so reading the file
+    never runs code; tuples come back as lists. When full, the entries closest
+    to expiry are evicted first, which keeps cache hits read-only.
+    """
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None or getattr(self.local, "pid", None) != os.getpid():
+            conn = self.local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self.local.pid = os.getpid()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cached_value "
+                         "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cached_value_expires ON cached_value (expires_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS table_version (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        return conn
+    def get(self, key):
+        row = self._conn().execute("SELECT value, expires_at FROM cached_value WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0], object_hook=_decode)
+    def set(self, key, value, ttl):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO cached_value (key, value, expires_at) VALUES (?, ?, ?)",
+                     (key, json.dumps(value, default=_encode), time.time() + ttl))
+        overflow = conn.execute("SELECT count(*) FROM cached_value").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute("DELETE FROM cached_value WHERE key IN "
+                         "(SELECT key FROM cached_value ORDER BY expires_at LIMIT ?)", (overflow,))
+    def table_versions(self, tables):
+        versions = dict(self._conn().execute(
+            "SELECT name, version FROM table_version WHERE name IN (%s)" % ",".join("?" * len(tables)), list(tables)))
+        return tuple(versions.get(t, 0) for t in tables)
+    def bump(self, tables):
+        self._conn().executemany(
+            "INSERT INTO table_version VALUES (?, 1) ON CONFLICT (name) DO UPDATE SET version = version + 1",
+            [(t,) for t in tables])
+def _sqlite_cache():
+    path = current_app.config["CACHE_PATH"]
+    if not path:
+        os.makedirs(current_app.instance_path, exist_ok=True)
+        path = os.path.join(current_app.instance_path, "cache.db")
+    return SQLiteCache(path, current_app.config["CACHE_MAX_ENTRIES"])
+CACHE_BACKENDS = {
+    "memory": lambda: MemoryCache(current_app.config["CACHE_MAX_ENTRIES"]),
+    "sqlite": _sqlite_cache,
+    "none": lambda: None,
+}
+_cache = {}  # backend name -> instance, built on first use
+_written_tables = threading.local()  # tables written by this thread's open transaction
+def get_cache():
+    """The configured cache backend, or None when caching is off."""
+    backend = current_app.config["CACHE_BACKEND"]
+    if backend not in _cache:
+        _cache[backend] = CACHE_BACKENDS[backend]()
+    return _cache[backend]
+@event.listens_for(Engine, "after_cursor_execute")
+def track_written_tables(conn, cursor, statement, parameters, context, executemany):
+    if context is None or context.compiled is None or not (context.isinsert or context.isupdate or context.isdelete):
+        return
+    table = getattr(context.compiled.statement, "table", None)
+    if table is not None:
+        if not hasattr(_written_tables, "names"):
+            _written_tables.names = set()
+        _written_tables.names.add(table.name)
+@event.listens_for(Session, "after_commit")
+def bump_table_versions(session):
+    names = getattr(_written_tables, "names", None)
+    if names:
+        _written_tables.names = set()
+        cache = get_cache()
+        if cache is not None:
+            cache.bump(sorted(names))
+@event.listens_for(Session, "after_rollback")
+def forget_written_tables(session):
+    _written_tables.names = set()
+def _cache_key(kind, name, tables, ttl):
+    cache = get_cache()
+    # The TTL window in the key caps how long a page stays valid if another worker's write is missed
+    return "%s:%s:%s:%s:%d" % (kind, name, date.today(), ".".join(map(str, cache.table_versions(tables))),
+                               time.time() // ttl if ttl else 0)
+def cached_fragment(name, models, build, ttl=None):
+    """``build()``'s result, cached until one of the ``models``' tables is written.
+
+    Entries live for ``ttl`` seconds at most (CACHE_TTL by default; 0 disables caching).
+    """
+    cache = get_cache()
+    ttl = current_app.config["CACHE_TTL"] if ttl is None else ttl
+    if cache is None or not ttl:
+        return build()
+    key = _cache_key("fragment", name, [m.__tablename__ for m in models], ttl)
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, ttl)
+    return value
+def client_choices():
+    """{"id", "name"} of every client, by name, for the client dropdowns."""
+    return cached_fragment("clients", [Client], lambda: [
+        {"id": client_id, "name": name}
+        for client_id, name in db.session.query(Client.id, Client.name).order_by(Client.name)
+    ])
+def employee_choices():
+    """{"id", "name"} of every employee, by name, for the employee dropdowns."""
+    return cached_fragment("employees", [Employee], lambda: [
+        {"id": employee_id, "name": name}
+        for employee_id, name in db.session.query(Employee.id, Employee.name).order_by(Employee.name)
+    ])
+def cached_page(*models):
+    """Cache a view's GET responses per URL until one of the ``models``' tables is written.
+
+    Conditional GETs are answered with 304 from the ETag alone. Requests with
+    flashed messages waiting bypass the cache, as the page would show them.
+    """
+    tables = [m.__tablename__ for m in models]
+    def decorator(view):
+        @functools.wraps(view)
+        def cached_view(*args, **kwargs):
+            cache = get_cache()
+            if cache is None or not current_app.config["CACHE_TTL"] or request.method != "GET" or session.get("_flashes"):
+                return view(*args, **kwargs)
+            key = _cache_key("page", request.full_path, tables, current_app.config["CACHE_TTL"])
+            etag = hashlib.sha1(key.encode()).hexdigest()
+            if etag in request.if_none_match:
+                resp = Response(status=304)
+            else:
+                hit = cache.get(key)
+                if hit is not None:
+                    resp = Response(hit[1], status=hit[0], mimetype=hit[2])
+                    resp.headers["X-Cache"] = "HIT"
+                else:
+                    resp = make_response(view(*args, **kwargs))
+                    if resp.status_code == 200 and not resp.is_streamed:
+                        cache.set(key, (resp.status_code, resp.get_data(), resp.mimetype), current_app.config["CACHE_TTL"])
+                    resp.headers["X-Cache"] = "MISS"
+            resp.set_etag(etag)
+            resp.cache_control.no_cache = True
+            return resp
+        return cached_view
+    return decorator
@@ -0,0 +1,506 @@
+import contextvars
+import functools
+import json
+import os
+import time
+import click
+from flask import Blueprint, current_app, g, got_request_exception
+from sqlalchemy import func, text
+from sqlalchemy.exc import OperationalError
+from datetime import datetime, date, timedelta
+from . import create_app
+from .database import db
+from .models import Client, ClientInvoice, ContentItem, EffortLog, Task
+from .jobs import run_jobs
+from .search import full_text_search, in_rank_order, rebuild_search_index, search_index_available
+from .pagination import content_item_query, invoice_query
+from .scorecard import queue_client_metrics, refresh_client_metrics
+from .scheduler import (
+    NOTIFICATION_SENDERS, drain_outbox, queue_due_soon_digests, run_scheduled_jobs, sweep_overdue,
+)
+from .analytics import (
+    ledger_pnl, parse_month, rebuild_effort_rollups, rebuild_ledger, rebuild_revenue_rollups, record_effort_logs,
+)
+from .accounts import run_billing
+from .imports import IMPORT_KINDS, bulk_import, import_format_for
+from .exports import EXPORTS, EXPORT_MIMETYPES, stream_export
+from .migrations import HOT_FILTER_INDEXES, create_indexes, run_migrations
+from .benchmarks import bench_paths, bench_routes, bench_startup, percentile, seed_demo_data
+# ----------------------
+# CLI helper
+# ----------------------
+bp = Blueprint("commands", __name__, cli_group=None)
+def writer_command(command):
+    """Mark a command that writes, so its transactions take the write lock up front like a writing request's."""
+    @functools.wraps(command)
+    def writing(*args, **kwargs):
+        g.writes = True
+        return command(*args, **kwargs)
+    return writing
+@bp.cli.command("init-db")
+@writer_command
+def init_db():
+    """Create the tables and apply pending migrations."""
+    for version, description in run_migrations():
+        click.echo("Applied migration %d: %s" % (version, description))
+# The filters behind dashboard(), planner(), efforts(), accounts() and tasks()
+HOT_QUERIES = [
+    ("dashboard: week pipeline",
+     "SELECT id FROM content_item WHERE date >= :start AND date <= :end ORDER BY date"),
+    ("dashboard: overdue content",
+     "SELECT id FROM content_item WHERE status = 'overdue' ORDER BY date"),
+    ("dashboard: overdue invoices",
+     "SELECT id FROM client_invoice WHERE status = 'overdue' ORDER BY due_date"),
+    ("dashboard: effort summary",
+     "SELECT client_id, SUM(time_minutes) FROM effort_log WHERE date >= :start AND date <= :end GROUP BY client_id"),
+    ("planner: client month",
+     "SELECT id FROM content_item WHERE date >= :start AND date <= :end AND client_id = :client_id ORDER BY date"),
+    ("efforts: client period",
+     "SELECT id FROM effort_log WHERE date >= :start AND date <= :end AND client_id = :client_id ORDER BY date DESC"),
+    ("accounts: client invoices",
+     "SELECT id FROM client_invoice WHERE client_id = :client_id ORDER BY due_date DESC"),
+    ("accounts: invoice payments",
+     "SELECT SUM(amount) FROM client_payment WHERE invoice_id = :invoice_id"),
+    ("tasks: status and employee",
+     "SELECT id FROM task WHERE status = :task_status AND assigned_to = :employee_id ORDER BY due_date"),
+]
+def _explain_hot_queries(engine, params):
+    results = {}
+    with engine.connect() as conn:
+        for label, sql in HOT_QUERIES:
+            plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params)]
+            timings = []
+            for _ in range(5):
+                started = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[label] = ("; ".join(plan), sorted(timings)[2])
+    return results
+@bp.cli.command("bench-indexes")
+@click.option("--rows", default=20000, show_default=True, help="Content items to generate; other tables scale from it.")
+def bench_indexes(rows):
+    """Show hot query plans and timings without any secondary index and with the hot filter indexes.
+
+    Runs against a throwaway in-memory SQLite database filled by seed_demo_data.
+    """
+    bench_app = create_app({
+        "SQLALCHEMY_DATABASE_URI": "sqlite://", "CACHE_BACKEND": "none", "JOB_WORKER": False, "SWEEPER_INTERVAL": 0,
+    })
+    with bench_app.app_context():
+        engine = db.engine
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            # Indexes SQLite builds itself for primary keys and unique constraints have no SQL
+            for (name,) in conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+            )).all():
+                conn.execute(text("DROP INDEX %s" % name))
+        seed_demo_data(clients=max(10, rows // 400), content=rows, efforts=rows // 2, invoices=rows // 4,
+                       tasks=rows // 10)
+        db.session.commit()
+        today = date.today()
+        params = {
+            "start": today.replace(day=1), "end": today, "client_id": 3,
+            "invoice_id": 7, "task_status": "pending", "employee_id": 5,
+        }
+        before = _explain_hot_queries(engine, params)
+        with engine.begin() as conn:
+            create_indexes(conn, *HOT_FILTER_INDEXES)
+            conn.execute(text("ANALYZE"))
+        after = _explain_hot_queries(engine, params)
+        for label, _ in HOT_QUERIES:
+            click.echo(label)
+            click.echo("  before %8.2f ms  %s" % (before[label][1], before[label][0]))
+            click.echo("  after  %8.2f ms  %s" % (after[label][1], after[label][0]))
+@bp.cli.command("rebuild-revenue-rollups")
+@writer_command
+def rebuild_revenue_rollups_command():
+    """Rebuild the per-month revenue rollups from paid invoices."""
+    count = rebuild_revenue_rollups()
+    db.session.commit()
+    click.echo("Rebuilt %d revenue rollup rows." % count)
+@bp.cli.command("rebuild-effort-rollups")
+@writer_command
+def rebuild_effort_rollups_command():
+    """Rebuild the per-day effort rollups from the effort logs."""
+    count = rebuild_effort_rollups()
+    db.session.commit()
+    click.echo("Rebuilt %d effort rollup rows." % count)
+@bp.cli.command("rebuild-ledger")
+@writer_command
+def rebuild_ledger_command():
+    """Rebuild the monthly ledger rollups from client payments and payments out."""
+    count = rebuild_ledger()
+    db.session.commit()
+    click.echo("Rebuilt %d ledger rollup rows." % count)
+@bp.cli.command("rebuild-client-metrics")
+@writer_command
+def rebuild_client_metrics_command():
+    """Recompute every client's scorecard (delivery, effort, balances, last payment)."""
+    count = refresh_client_metrics()
+    db.session.commit()
+    click.echo("Rebuilt %d client scorecards." % count)
+@bp.cli.command("ledger")
+@click.option("--start", help="First month, YYYY-MM (default: 11 months before --end).")
+@click.option("--end", help="Last month, YYYY-MM (default: this month).")
+def ledger_command(start, end):
+    """Print the monthly P&L."""
+    end = end or date.today().strftime("%Y-%m")
+    start = start or (parse_month(end) - timedelta(days=334)).strftime("%Y-%m")
+    try:
+        parse_month(start), parse_month(end)
+    except ValueError:
+        raise click.BadParameter("expected YYYY-MM")
+    months, totals = ledger_pnl(start, end)
+    click.echo("%-8s %14s %14s %14s %14s" % ("month", "cash in", "cash out", "effort cost", "profit"))
+    for row in months + [dict(totals, month="total")]:
+        click.echo("%-8s %14.2f %14.2f %14.2f %14.2f" % (
+            row["month"], row["cash_in"], row["cash_out"], row["effort_cost"], row["profit"]))
+@bp.cli.command("rebuild-search-index")
+@writer_command
+def rebuild_search_index_command():
+    """Rebuild the full-text search index (SQLite only)."""
+    if not search_index_available():
+        raise click.ClickException("No search index; run `flask init-db` on a SQLite database first.")
+    count = rebuild_search_index(db.session.connection())
+    db.session.commit()
+    click.echo("Indexed %d rows." % count)
+@bp.cli.command("bench-search")
+@click.argument("queries", nargs=-1, required=True)
+@click.option("--repeat", default=20, show_default=True)
+def bench_search(queries, repeat):
+    """Time the full-text search against the old ILIKE scans for each query."""
+    if not search_index_available():
+        raise click.ClickException("No search index; run `flask init-db` on a SQLite database first.")
+    def ilike(q):
+        like = f"%{q}%"
+        Client.query.filter(Client.name.ilike(like)).all()
+        content_item_query().filter(ContentItem.title.ilike(like)).all()
+        Task.query.filter(Task.title.ilike(like)).all()
+        invoice_query().join(Client).filter(Client.name.ilike(like)).all()
+    def fts(q):
+        ids = full_text_search(q, current_app.config["SEARCH_LIMIT"])
+        in_rank_order(Client.query, Client, ids["client"])
+        in_rank_order(content_item_query(), ContentItem, ids["content"])
+        in_rank_order(Task.query, Task, ids["task"])
+        in_rank_order(invoice_query(), ClientInvoice, ids["invoice"])
+    for q in queries:
+        for label, fn in (("ilike", ilike), ("fts", fts)):
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                fn(q)
+                timings.append((time.perf_counter() - started) * 1000)
+                db.session.rollback()
+            timings.sort()
+            click.echo("%-20s %-6s p50 %8.2f ms  max %8.2f ms" % (q, label, timings[len(timings) // 2], timings[-1]))
+@bp.cli.command("import-data")
+@click.argument("kind", type=click.Choice(sorted(IMPORT_KINDS)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "json"]), help="Defaults to the file extension.")
+@writer_command
+def import_data(kind, path, fmt):
+    """Bulk import content items, effort logs or invoices from CSV or JSON."""
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        report = bulk_import(kind, stream, fmt or import_format_for(path))
+    for error in report["errors"]:
+        click.echo("row %(row)d: %(error)s" % error, err=True)
+    if report.get("aborted"):
+        click.echo("Stopped early: %s" % report["aborted"], err=True)
+    click.echo("Imported %d rows, %d failed." % (report["inserted"], report["failed"]))
+@bp.cli.command("export")
+@click.argument("kind", type=click.Choice(sorted(EXPORTS)))
+@click.option("--format", "fmt", type=click.Choice(sorted(EXPORT_MIMETYPES)), default="csv", show_default=True)
+@click.option("--output", "-o", type=click.File("wb"), default="-", help="Defaults to stdout.")
+@click.option("--start", type=click.DateTime(["%Y-%m-%d"]), help="First date to include.")
+@click.option("--end", type=click.DateTime(["%Y-%m-%d"]), help="Last date to include.")
+@click.option("--client-id", type=int)
+def export_command(kind, fmt, output, start, end, client_id):
+    """Stream invoices, payments, payments out, effort logs or content items to CSV/XLSX."""
+    for chunk in stream_export(kind, fmt, start and start.date(), end and end.date(), client_id):
+        output.write(chunk)
+@bp.cli.command("billing-run")
+@click.argument("month")
+@click.option("--dry-run", is_flag=True, help="Show the invoices without creating them.")
+@writer_command
+def billing_run_command(month, dry_run):
+    """Invoice every active client's retainer for MONTH (YYYY-MM)."""
+    try:
+        parse_month(month)
+    except ValueError:
+        raise click.BadParameter("expected YYYY-MM", param_hint="MONTH")
+    planned = run_billing(month, dry_run=dry_run)
+    for row in planned:
+        click.echo("%-40s %12.2f  due %s" % (row["client_name"], row["amount"], row["due_date"]))
+    verb = "Would create" if dry_run else "Created"
+    click.echo("%s %d invoices totalling %.2f." % (verb, len(planned), sum(r["amount"] for r in planned)))
+@bp.cli.command("sweep-overdue")
+@click.option("--force", is_flag=True, help="Sweep even if it already ran today.")
+@writer_command
+def sweep_overdue_command(force):
+    """Mark past-due content items, invoices and tasks as overdue."""
+    result = sweep_overdue(force=force)
+    if result is None:
+        click.echo("Already swept today.")
+    else:
+        click.echo("Marked %d content items, %d invoices and %d tasks overdue." % result)
+@bp.cli.command("queue-digests")
+@click.option("--force", is_flag=True, help="Queue even if today's digests were already queued.")
+@writer_command
+def queue_digests_command(force):
+    """Queue each employee's overdue and due-soon task digest."""
+    queued = queue_due_soon_digests(force=force)
+    if queued is None:
+        click.echo("Already queued today.")
+    else:
+        click.echo("Queued %d digests." % queued)
+@bp.cli.command("drain-outbox")
+@click.option("--sender", type=click.Choice(sorted(NOTIFICATION_SENDERS)), help="Defaults to NOTIFICATION_SENDER.")
+@click.option("--batch-size", type=int, help="Defaults to OUTBOX_BATCH_SIZE.")
+@writer_command
+def drain_outbox_command(sender, batch_size):
+    """Deliver pending outbox messages until none are left."""
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = drain_outbox(batch_size, sender)
+        total_sent += sent
+        total_failed += failed
+        if not sent:
+            break
+    click.echo("Sent %d messages, %d failed attempts." % (total_sent, total_failed))
+@bp.cli.command("run-jobs")
+@click.option("--once", is_flag=True, help="Run the due jobs once, then exit.")
+@click.option("--interval", default=5, show_default=True, help="Seconds between polls when idle.")
+@writer_command
+def run_jobs_command(once, interval):
+    """Run queued background jobs (alongside or instead of the in-process JOB_WORKER thread)."""
+    total_done = total_failed = 0
+    while True:
+        done, failed = run_jobs()
+        total_done += done
+        total_failed += failed
+        if not done and not failed:
+            if once:
+                break
+            time.sleep(interval)
+    click.echo("Ran %d jobs, %d failed attempts." % (total_done, total_failed))
+@bp.cli.command("scheduler")
+@click.option("--interval", default=60, show_default=True, help="Seconds between runs.")
+@click.option("--once", is_flag=True, help="Run the jobs and drain the outbox once, then exit.")
+@writer_command
+def scheduler_command(interval, once):
+    """Run the daily jobs and drain the outbox in a loop (for a dedicated worker or cron)."""
+    while True:
+        try:
+            run_scheduled_jobs()
+            while drain_outbox()[0]:
+                pass
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Scheduled jobs failed")
+            if once:
+                raise
+        if once:
+            break
+        time.sleep(interval)
+@bp.cli.command("seed")
+@click.option("--scale", default=1.0, show_default=True, help="Multiply every volume, e.g. 0.01 for a quick run.")
+@click.option("--clients", default=500, show_default=True)
+@click.option("--content", default=200000, show_default=True, help="Content items.")
+@click.option("--efforts", default=100000, show_default=True, help="Effort logs.")
+@click.option("--invoices", default=50000, show_default=True, help="Invoices; payments follow from their status.")
+@click.option("--tasks", default=20000, show_default=True)
+@click.option("--seed", "seed_value", default=42, show_default=True, help="Same seed and day, same data.")
+@click.option("--today", type=click.DateTime(["%Y-%m-%d"]), help="Day the data is generated around (default today).")
+@writer_command
+def seed_command(scale, clients, content, efforts, invoices, tasks, seed_value, today):
+    """Fill an empty database with synthetic data for benchmarking.
+
+    Point DATABASE_URL at a scratch database first, e.g. sqlite:////tmp/bench.db.
+    """
+    run_migrations()
+    if db.session.query(Client.id).first() is not None:
+        raise click.ClickException("The database already has clients; seed an empty one.")
+    started = time.perf_counter()
+    counts = seed_demo_data(
+        max(1, int(clients * scale)), int(content * scale), int(efforts * scale), int(invoices * scale),
+        int(tasks * scale), seed=seed_value, today=today and today.date(),
+    )
+    db.session.commit()
+    for table, count in counts.items():
+        click.echo("%-16s %9d" % (table, count))
+    click.echo("Seeded in %.1fs." % (time.perf_counter() - started))
+@bp.cli.command("bench-routes")
+@click.option("--repeat", default=20, show_default=True, help="Timed requests per path.")
+@click.option("--warmup", default=2, show_default=True, help="Untimed requests per path first.")
+@click.option("--match", help="Only paths containing this text.")
+@click.option("--cached", is_flag=True, help="Keep the dashboard and response caches on (default: measure uncached).")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True), default="bench-results.json", show_default=True)
+@click.option("--label", help="Free-form note stored with the results.")
+@click.option("--compare", type=click.Path(exists=True, dir_okay=False), help="Earlier results file to diff against.")
+def bench_routes_command(repeat, warmup, match, cached, output, label, compare):
+    """Time every read-only route through the test client and save latency percentiles and query counts."""
+    import platform
+    import subprocess
+    current_app.config["SWEEPER_INTERVAL"] = 0
+    if not cached:
+        current_app.config.update(DASHBOARD_CACHE_TTL=0, CACHE_TTL=0)
+    paths = [(e, p) for e, p in bench_paths() if not match or match in p]
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=current_app.root_path,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    previous = {}
+    if compare:
+        with open(compare) as fh:
+            previous = {r["path"]: r for r in json.load(fh)["results"]}
+    results = []
+    click.echo("%-52s %4s %9s %9s %9s %6s" % ("path", "code", "p50 ms", "p90 ms", "p99 ms", "sql"))
+    for result in bench_routes(paths, repeat, warmup):
+        results.append(result)
+        line = "%-52s %4d %9.2f %9.2f %9.2f %6d" % (
+            result["path"][:52], result["status"], result["p50_ms"], result["p90_ms"], result["p99_ms"], result["queries"])
+        before = previous.get(result["path"])
+        if before:
+            line += "  p50 %+6.1f%%  sql %+d" % (
+                (result["p50_ms"] / before["p50_ms"] - 1) * 100 if before["p50_ms"] else 0,
+                result["queries"] - before["queries"])
+        click.echo(line)
+    with open(output, "w") as fh:
+        json.dump({
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "label": label,
+            "commit": commit,
+            "python": platform.python_version(),
+            "database": db.engine.url.render_as_string(hide_password=True),
+            "row_counts": {name: db.session.query(func.count()).select_from(table).scalar()
+                           for name, table in sorted(db.metadata.tables.items())},
+            "repeat": repeat,
+            "warmup": warmup,
+            "cached": cached,
+            "results": results,
+        }, fh, indent=2)
+    click.echo("Wrote %d results to %s" % (len(results), output))
+@bp.cli.command("bench-startup")
+@click.option("--repeat", default=10, show_default=True, help="Fresh interpreters to time.")
+@click.option("--target", default="app:app", show_default=True, help="module:attribute to load, an app or an app factory.")
+@click.option("--path", type=click.Path(exists=True, file_okay=False),
+              help="Checkout to import it from (default: this one), e.g. an older commit's worktree.")
+def bench_startup_command(repeat, target, path):
+    """Time a worker's boot: import, app creation and first request, cold and forked from a preloaded master."""
+    path = os.path.abspath(path or os.path.dirname(current_app.root_path))
+    samples = bench_startup(target, path, repeat)
+    click.echo("%s from %s, %d runs" % (target, path, repeat))
+    click.echo("%-20s %10s %10s %10s" % ("", "min", "p50", "max"))
+    for key, values in samples.items():
+        if key != "status":
+            click.echo("%-20s %10.1f %10.1f %10.1f" % (key, values[0], percentile(values, 50), values[-1]))
+    if samples["status"][-1] != 200:
+        raise click.ClickException("The first request answered %d" % samples["status"][-1])
+def _load_test_worker(app, worker, count, client_id, item_ids, results, done):
+    # Forked workers must not reuse the parent's pooled connections
+    with app.app_context():
+        db.engine.dispose(close=False)
+    app.config.update(SWEEPER_INTERVAL=0, DASHBOARD_CACHE_TTL=0, EXPORT_CHUNK_SIZE=50)
+    errors = []
+    got_request_exception.connect(lambda sender, exception, **extra: errors.append(exception), app, weak=False)
+    client = app.test_client()
+    today = date.today().isoformat()
+    tally = {"ok": 0, "locked": 0, "failed": 0, "timings": []}
+    i = 0
+    while (i < count) if done is None else not done.is_set():
+        started = time.perf_counter()
+        try:
+            if done is not None:
+                # Every third read is an effort export downloaded by a slow client,
+                # which keeps its SELECT open for the whole download
+                resp = client.get(("/", "/planner", "/export/efforts.csv")[i % 3])
+                for _ in resp.response:
+                    time.sleep(0.02 if i % 3 == 2 else 0)
+                resp.close()
+            elif i % 2:
+                resp = client.post("/efforts", data={
+                    "client_id": client_id, "date": today, "time_minutes": 15, "notes": "load test %d" % worker,
+                })
+            else:
+                item_id = item_ids[(worker + i) % len(item_ids)]
+                resp = client.get("/planner/%d/status/%s" % (item_id, ("planned", "done")[i // 2 % 2]))
+        except Exception as exc:
+            # Streamed exports fail after the view has returned
+            errors.append(exc)
+        tally["timings"].append((time.perf_counter() - started) * 1000)
+        if errors:
+            exc = errors[-1]
+            errors.clear()
+            tally["locked" if isinstance(exc, OperationalError) and "locked" in str(exc) else "failed"] += 1
+        else:
+            tally["ok" if resp.status_code < 400 else "failed"] += 1
+        i += 1
+    results.put((done is not None, tally))
+@bp.cli.command("load-test")
+@click.option("--workers", default=8, show_default=True, help="Concurrent writer processes.")
+@click.option("--requests", "count", default=100, show_default=True, help="Requests per writer.")
+@click.option("--readers", default=4, show_default=True,
+              help="Processes browsing the dashboard and planner and downloading exports until the writers finish.")
+@writer_command
+def load_test(workers, count, readers):
+    """Hammer the effort log form and planner status links from concurrent processes.
+
+    Writes to the configured database, so point DATABASE_URL at a scratch copy.
+    Run once with SQLITE_TUNING=0 to see the untuned lock errors.
+    """
+    import multiprocessing
+    app = current_app._get_current_object()
+    client = Client.query.order_by(Client.id).first()
+    if client is None:
+        client = Client(name="Load test client")
+        db.session.add(client)
+        db.session.flush()
+    item_ids = [row.id for row in ContentItem.query.with_entities(ContentItem.id).limit(workers * 4)]
+    for i in range(len(item_ids), workers * 4):
+        item = ContentItem(client_id=client.id, date=date.today(), title="Load test %d" % i)
+        db.session.add(item)
+        db.session.flush()
+        item_ids.append(item.id)
+    # Enough effort logs that an export download takes a while
+    missing = 2000 - EffortLog.query.count()
+    if missing > 0:
+        logs = [{"client_id": client.id, "date": date.today(), "time_minutes": 15, "notes": "load test"}] * missing
+        db.session.execute(EffortLog.__table__.insert(), logs)
+        record_effort_logs(logs)
+    client_id = client.id
+    queue_client_metrics([client_id])
+    db.session.commit()
+    # Reloading expired rows now would begin a write transaction (this is a writer
+    # command) and hold the lock for the whole run, so only plain values are used below.
+    context = multiprocessing.get_context("fork")
+    results, done = context.Queue(), context.Event()
+    # Workers start from an empty contextvars.Context so they do not inherit
+    # this command's app context; each request then gets (and tears down) its own.
+    procs = [
+        context.Process(target=contextvars.Context().run,
+                        args=(_load_test_worker, app, w, count, client_id, item_ids, results, reads_until))
+        for reads_until, n in ((None, workers), (done, readers))
+        for w in range(n)
+    ]
+    started = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    tallies = [results.get() for _ in range(workers)]
+    elapsed = time.perf_counter() - started
+    done.set()
+    tallies += [results.get() for _ in range(readers)]
+    for proc in procs:
+        proc.join()
+    click.echo("%s: %d writers x %d requests, %d readers, %.2fs" % (
+        db.engine.url.render_as_string(hide_password=True), workers, count, readers, elapsed))
+    for label, is_reader in (("writes", False), ("reads", True)):
+        group = [tally for reader, tally in tallies if reader is is_reader]
+        timings = sorted(t for tally in group for t in tally["timings"])
+        if not timings:
+            continue
+        total = len(timings)
+        click.echo("%-6s ok %d  locked %d  other errors %d  %.0f req/s  p50 %.1f ms  p95 %.1f ms  max %.1f ms" % (
+            label, *(sum(t[k] for t in group) for k in ("ok", "locked", "failed")), total / elapsed,
+            timings[total // 2], timings[int(total * 0.95)], timings[-1]))
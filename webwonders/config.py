@@ -0,0 +1,82 @@
+import os
+import re
+def load_environ(config):
+    """Fill ``config`` with the settings read from the environment, or their defaults."""
+    # Any SQLAlchemy URL; PostgreSQL needs a driver such as psycopg2 installed.
+    # Hosts like Heroku/Render hand out postgres://, which SQLAlchemy no longer accepts.
+    config["SQLALCHEMY_DATABASE_URI"] = re.sub(
+        r"^postgres://", "postgresql://", os.environ.get("DATABASE_URL", "sqlite:////tmp/web_wonders.db")
+    )
+    config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "change_me_for_production")
+    # Milliseconds a SQLite writer waits for the lock before "database is locked"
+    config["SQLITE_BUSY_TIMEOUT"] = int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000))
+    # Bytes of the SQLite file memory-mapped for reads; 0 disables
+    config["SQLITE_MMAP_SIZE"] = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    # Log SQL statements slower than this many milliseconds; 0 disables the slow-query log
+    config["SLOW_QUERY_MS"] = float(os.environ.get("SLOW_QUERY_MS", 0))
+    # Add a Server-Timing header (db/template/total) to every response; always on in debug mode
+    config["SERVER_TIMING"] = os.environ.get("SERVER_TIMING", "0") == "1"
+    # Set to 0 to open SQLite with its defaults (rollback journal, no busy timeout), e.g. to compare with `flask load-test`
+    config["SQLITE_TUNING"] = os.environ.get("SQLITE_TUNING", "1") != "0"
+    # Seconds between in-process overdue sweeps, digest runs and outbox drains; 0 disables the thread (use `flask scheduler` instead)
+    config["SWEEPER_INTERVAL"] = int(os.environ.get("SWEEPER_INTERVAL", 900))
+    # Seconds a cached dashboard snapshot is reused at most; 0 disables the cache
+    config["DASHBOARD_CACHE_TTL"] = int(os.environ.get("DASHBOARD_CACHE_TTL", 60))
+    # Rows per page for the paginated list views
+    config["PAGE_SIZE"] = int(os.environ.get("PAGE_SIZE", 50))
+    # Best-ranked full-text matches shown per search section
+    config["SEARCH_LIMIT"] = int(os.environ.get("SEARCH_LIMIT", 20))
+    # Rows per INSERT transaction in bulk imports
+    config["IMPORT_BATCH_SIZE"] = int(os.environ.get("IMPORT_BATCH_SIZE", 500))
+    # Rows fetched from the database cursor per chunk of a streamed export
+    config["EXPORT_CHUNK_SIZE"] = int(os.environ.get("EXPORT_CHUNK_SIZE", 1000))
+    # Day of the billed month that retainer invoices fall due
+    config["BILLING_DUE_DAY"] = int(os.environ.get("BILLING_DUE_DAY", 10))
+    # Hours an employee without their own weekly_capacity_hours can work per week, for the workload page
+    config["WEEKLY_CAPACITY_HOURS"] = float(os.environ.get("WEEKLY_CAPACITY_HOURS", 40))
+    # Days of logged effort the client scorecard weighs against the monthly retainer
+    config["SCORECARD_EFFORT_DAYS"] = int(os.environ.get("SCORECARD_EFFORT_DAYS", 30))
+    # Cost of one hour of team time, for the effort-vs-retainer margin
+    config["HOURLY_COST"] = float(os.environ.get("HOURLY_COST", 0))
+    # Most rows one /api batch create or update may carry
+    config["API_BATCH_LIMIT"] = int(os.environ.get("API_BATCH_LIMIT", 1000))
+    # Where cached pages and fragments live: "memory" (per worker), "sqlite" (CACHE_PATH, shared by
+    # every worker on the host, so a write in one invalidates all) or "none"; CACHE_PATH defaults to
+    # cache.db in the app's instance folder
+    config["CACHE_BACKEND"] = os.environ.get("CACHE_BACKEND", "memory")
+    config["CACHE_PATH"] = os.environ.get("CACHE_PATH")
+    # Most entries kept before the oldest are evicted
+    config["CACHE_MAX_ENTRIES"] = int(os.environ.get("CACHE_MAX_ENTRIES", 1000))
+    # Longest a cached page or fragment is served; also bounds staleness across "memory" workers
+    config["CACHE_TTL"] = int(os.environ.get("CACHE_TTL", 60))
+    # Open tasks due within this many days go into each employee's daily digest
+    config["DUE_SOON_DAYS"] = int(os.environ.get("DUE_SOON_DAYS", 3))
+    # How outbox notifications are delivered: "log", "file" (NOTIFICATION_FILE) or "smtp" (SMTP_HOST)
+    config["NOTIFICATION_SENDER"] = os.environ.get("NOTIFICATION_SENDER", "log")
+    config["NOTIFICATION_FILE"] = os.environ.get("NOTIFICATION_FILE", "/tmp/web_wonders-notifications.log")
+    config["SMTP_HOST"] = os.environ.get("SMTP_HOST", "localhost")
+    config["SMTP_PORT"] = int(os.environ.get("SMTP_PORT", 25))
+    config["SMTP_FROM"] = os.environ.get("SMTP_FROM", "noreply@localhost")
+    # Outbox messages sent per batch, and delivery attempts before a message is given up
+    config["OUTBOX_BATCH_SIZE"] = int(os.environ.get("OUTBOX_BATCH_SIZE", 100))
+    config["OUTBOX_MAX_ATTEMPTS"] = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 5))
+    # Seconds before a failed delivery is retried; doubles with every attempt
+    config["OUTBOX_RETRY_DELAY"] = int(os.environ.get("OUTBOX_RETRY_DELAY", 60))
+    # Run queued background jobs in a thread of each web worker; set to 0 to leave them to `flask run-jobs`
+    config["JOB_WORKER"] = os.environ.get("JOB_WORKER", "1") != "0"
+    # Attempts before a background job is marked failed, and seconds before the first retry (doubles each time)
+    config["JOB_MAX_ATTEMPTS"] = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+    config["JOB_RETRY_DELAY"] = int(os.environ.get("JOB_RETRY_DELAY", 10))
+    # Days finished jobs and sent outbox messages are kept before the daily cleanup deletes them
+    config["RETENTION_DAYS"] = int(os.environ.get("RETENTION_DAYS", 30))
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for ``uri``: a connection pool per worker process for server databases."""
+    if uri.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": True,
+    }
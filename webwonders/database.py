@@ -0,0 +1,98 @@
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+db = SQLAlchemy()
+# ----------------------
+# SQLite connection tuning
+# ----------------------
+# WAL lets readers run alongside the single writer, and busy_timeout makes a
+# second writer wait for the lock instead of failing straight away.  pysqlite's
+# own transaction handling is switched off so the "begin" hook below decides
+# how each transaction starts.  The hooks are attached to each app's engines
+# by create_app() with the settings read there, since a streamed response
+# may open its connection after the app context has gone.
+def tune_sqlite(engine, config):
+    """Attach the connection and transaction hooks to a SQLite ``engine`` unless SQLITE_TUNING is off."""
+    if engine.dialect.name != "sqlite" or not config["SQLITE_TUNING"]:
+        return
+    busy_timeout, mmap_size = config["SQLITE_BUSY_TIMEOUT"], config["SQLITE_MMAP_SIZE"]
+    @event.listens_for(engine, "connect")
+    def sqlite_on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=%d" % busy_timeout)
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA mmap_size=%d" % mmap_size)
+        cursor.close()
+    # A deferred transaction that reads and then writes cannot wait out a lock
+    # taken by another writer in the meantime; SQLite fails it with "database is
+    # locked" regardless of busy_timeout.  Requests that write therefore take the
+    # write lock up front with BEGIN IMMEDIATE, and everything else stays deferred
+    # so reads never queue behind writers.
+    @event.listens_for(engine, "begin")
+    def sqlite_on_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if request_writes() else "BEGIN")
+def request_writes():
+    if not has_request_context():
+        # Background threads that write set g.writes in their app context
+        return has_app_context() and g.get("writes", False)
+    view = current_app.view_functions.get(request.endpoint)
+    return request.method not in ("GET", "HEAD", "OPTIONS") or getattr(view, "writes_on_get", False)
+def writes_on_get(view):
+    """Mark a GET view that changes data (the status links) as a writer."""
+    view.writes_on_get = True
+    return view
+# ----------------------
+# Bulk upsert helpers
+# ----------------------
+def upsert_increment(model, keys, rows, counters=None):
+    """Insert rollup rows, adding to the counters of rows that already exist.
+
+    ``keys`` are the primary key columns; ``counters`` default to every other
+    column in ``rows``. Rows sharing a key are summed first, as PostgreSQL
+    will not let one statement update a row twice. Uses a single INSERT ..
+    ON CONFLICT DO UPDATE where supported.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    if counters is None:
+        counters = [k for k in rows[0] if k not in keys]
+    merged = {}
+    for row in rows:
+        key = tuple(row[k] for k in keys)
+        if key in merged:
+            for k in counters:
+                merged[key][k] += row[k]
+        else:
+            merged[key] = dict(row)
+    rows = list(merged.values())
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else pg_insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={k: table.c[k] + stmt.excluded[k] for k in counters}
+        )
+        db.session.execute(stmt)
+        return
+    for row in rows:
+        updated = db.session.execute(
+            table.update()
+            .where(and_(*(table.c[k] == row[k] for k in keys)))
+            .values({k: table.c[k] + row[k] for k in counters})
+        ).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(row))
+def insert_ignoring_conflicts(table):
+    """INSERT statement that skips rows violating a unique constraint."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite_insert(table).on_conflict_do_nothing()
+    if dialect == "postgresql":
+        return pg_insert(table).on_conflict_do_nothing()
+    return table.insert()
@@ -0,0 +1,150 @@
+import csv
+import io
+import re
+import zipfile
+from flask import current_app
+from sqlalchemy import select
+from datetime import datetime, date
+from xml.sax.saxutils import escape as xml_escape
+from .database import db
+from .models import Client, ClientInvoice, ClientPayment, ContentItem, EffortLog, PaymentOut
+# ----------------------
+# Streaming export
+# ----------------------
+# Exports select plain columns (no ORM instances) through a streaming cursor
+# and encode each fetched chunk as soon as it arrives, so a multi-year ledger
+# starts downloading at once and never sits in memory as a whole.
+EXPORTS = {
+    # kind: (model, date column, client column, columns)
+    "invoices": (ClientInvoice, ClientInvoice.due_date, ClientInvoice.client_id, [
+        ClientInvoice.id, Client.name.label("client"), ClientInvoice.month, ClientInvoice.amount,
+        ClientInvoice.amount_paid, ClientInvoice.due_date, ClientInvoice.status, ClientInvoice.created_at,
+    ]),
+    "payments": (ClientPayment, ClientPayment.payment_date, ClientPayment.client_id, [
+        ClientPayment.id, Client.name.label("client"), ClientPayment.invoice_id, ClientPayment.amount,
+        ClientPayment.payment_date, ClientPayment.mode, ClientPayment.reference, ClientPayment.notes,
+    ]),
+    "payments_out": (PaymentOut, PaymentOut.payment_date, PaymentOut.related_client_id, [
+        PaymentOut.id, PaymentOut.vendor_name, Client.name.label("related_client"), PaymentOut.amount,
+        PaymentOut.payment_date, PaymentOut.mode, PaymentOut.category, PaymentOut.notes,
+    ]),
+    "efforts": (EffortLog, EffortLog.date, EffortLog.client_id, [
+        EffortLog.id, Client.name.label("client"), EffortLog.date, EffortLog.posts_count,
+        EffortLog.reels_count, EffortLog.time_minutes, EffortLog.notes,
+    ]),
+    "content": (ContentItem, ContentItem.date, ContentItem.client_id, [
+        ContentItem.id, Client.name.label("client"), ContentItem.date, ContentItem.platform,
+        ContentItem.content_type, ContentItem.title, ContentItem.status, ContentItem.posted_url,
+        ContentItem.caption, ContentItem.remarks,
+    ]),
+}
+EXPORT_MIMETYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+def export_statement(kind, start=None, end=None, client_id=None):
+    model, date_column, client_column, columns = EXPORTS[kind]
+    stmt = select(*columns).select_from(model).outerjoin(Client, client_column == Client.id)
+    if start:
+        stmt = stmt.where(date_column >= start)
+    if end:
+        stmt = stmt.where(date_column <= end)
+    if client_id:
+        stmt = stmt.where(client_column == client_id)
+    return stmt.order_by(date_column, model.id)
+def iter_export_chunks(engine, stmt, chunk_size):
+    """Yield (header, None) and then lists of row tuples from a server-side cursor."""
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        yield list(result.keys()), None
+        for rows in result.partitions():
+            yield None, rows
+def iter_csv(chunks):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for header, rows in chunks:
+        writer.writerows([header] if header else rows)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable buffer that zipfile writes into and we drain."""
+    def __init__(self):
+        self.chunks = []
+    def writable(self):
+        return True
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+def _xlsx_cell(value):
+    if value is None:
+        return "<c/>"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return "<c><v>%r</v></c>" % value
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    return '<c t="inlineStr"><is><t xml:space="preserve">%s</t></is></c>' % xml_escape(
+        _XML_ILLEGAL.sub("", str(value)))
+def iter_xlsx(chunks):
+    """Stream a single-sheet workbook; the sheet XML is written chunk by chunk."""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in _XLSX_PARTS.items():
+            zf.writestr(name, xml)
+        with zf.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            for header, rows in chunks:
+                sheet.write("".join(
+                    "<row>%s</row>" % "".join(_xlsx_cell(v) for v in row) for row in ([header] if header else rows)
+                ).encode("utf-8"))
+                yield sink.drain()
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.drain()
+def stream_export(kind, fmt, start=None, end=None, client_id=None):
+    """Generator of encoded export bytes.
+
+    It opens its connection on the first chunk, so a view returning it must
+    keep the request context alive with stream_with_context().
+    """
+    chunks = iter_export_chunks(
+        db.engine, export_statement(kind, start, end, client_id), current_app.config["EXPORT_CHUNK_SIZE"])
+    return iter_csv(chunks) if fmt == "csv" else iter_xlsx(chunks)
@@ -0,0 +1,198 @@
+import csv
+import json
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from datetime import date
+from .database import db, upsert_increment
+from .models import CONTENT_STATUSES, Client, ClientInvoice, ContentItem, EffortLog, RevenueRollup
+from .scorecard import queue_client_metrics
+from .scheduler import sweep_overdue
+from .analytics import parse_month, record_effort_logs
+# ----------------------
+# Bulk import
+# ----------------------
+# CSV and JSON files are parsed one record at a time, validated against the
+# column specs below and inserted IMPORT_BATCH_SIZE rows per executemany
+# transaction, so memory stays flat however large the file is.
+IMPORT_MAX_ERRORS = 1000  # row errors kept for the report; the rest are only counted
+# Field parsers, shared with the JSON API's resource specs
+def text_field(value):
+    value = str(value).strip()
+    return value or None
+def date_field(value):
+    return date.fromisoformat(str(value).strip())
+def int_field(value):
+    return int(str(value).strip() or 0)
+def float_field(value):
+    return float(str(value).strip() or 0)
+def choice_field(*options):
+    def parse(value):
+        value = str(value).strip().lower()
+        if value not in options:
+            raise ValueError("must be one of %s" % ", ".join(options))
+        return value
+    return parse
+def month_field(value):
+    value = str(value).strip()
+    parse_month(value)
+    return value
+# kind: (model, {column: (parser, required, default)}); every kind also takes
+# a client name ("client") or id ("client_id")
+IMPORT_KINDS = {
+    "content": (ContentItem, {
+        "date": (date_field, True, None),
+        "platform": (text_field, False, None),
+        "content_type": (text_field, False, None),
+        "title": (text_field, False, None),
+        "caption": (text_field, False, None),
+        "status": (choice_field(*CONTENT_STATUSES), False, "planned"),
+        "posted_url": (text_field, False, None),
+        "remarks": (text_field, False, None),
+    }),
+    "efforts": (EffortLog, {
+        "date": (date_field, True, None),
+        "posts_count": (int_field, False, 0),
+        "reels_count": (int_field, False, 0),
+        "time_minutes": (int_field, False, 0),
+        "notes": (text_field, False, None),
+    }),
+    "invoices": (ClientInvoice, {
+        "month": (month_field, True, None),
+        "amount": (float_field, True, None),
+        "due_date": (date_field, True, None),
+        "status": (choice_field("pending", "paid", "overdue"), False, "pending"),
+    }),
+}
+def iter_json_records(stream, chunk_size=1 << 16):
+    """Yield the objects of a JSON array or JSON Lines text stream one at a time."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof, started = "", 0, False, False
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            chunk = stream.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+        if pos >= len(buf) or buf[pos] == "]":
+            return
+        if not started:
+            started = True
+            if buf[pos] == "[":
+                pos += 1
+                continue
+        try:
+            record, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError("Invalid JSON near character %d" % pos)
+            chunk = stream.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+        yield record
+def iter_import_records(stream, fmt):
+    if fmt == "csv":
+        return csv.DictReader(stream)
+    if fmt == "json":
+        return iter_json_records(stream)
+    raise ValueError("Unknown import format: %s" % fmt)
+def import_format_for(filename):
+    return "json" if filename.lower().endswith((".json", ".jsonl", ".ndjson")) else "csv"
+def _parse_import_row(record, spec, clients_by_name, client_ids):
+    if not isinstance(record, dict):
+        raise ValueError("expected an object")
+    record = {k.strip().lower(): v for k, v in record.items() if k and v not in (None, "")}
+    if "client_id" in record:
+        client_id = int_field(record["client_id"])
+        if client_id not in client_ids:
+            raise ValueError("unknown client_id %s" % client_id)
+    elif "client" in record:
+        client_id = clients_by_name.get(str(record["client"]).strip().lower())
+        if client_id is None:
+            raise ValueError("unknown client %r" % record["client"])
+    else:
+        raise ValueError("client is required")
+    row = {"client_id": client_id}
+    for column, (parse, required, default) in spec.items():
+        if column in record:
+            try:
+                row[column] = parse(record[column])
+            except ValueError as exc:
+                raise ValueError("%s: %s" % (column, exc))
+        elif required:
+            raise ValueError("%s is required" % column)
+        else:
+            row[column] = default
+    return row
+def _after_import_batch(kind, rows):
+    if kind in ("content", "efforts", "invoices"):
+        queue_client_metrics(row["client_id"] for row in rows)
+    if kind == "efforts":
+        record_effort_logs(rows)
+    elif kind == "invoices":
+        paid = {}
+        for row in rows:
+            if row["status"] == "paid":
+                key = (row["due_date"].strftime("%Y-%m"), row["client_id"])
+                paid[key] = paid.get(key, 0) + row["amount"]
+        upsert_increment(RevenueRollup, ("month", "client_id"), [
+            {"month": month, "client_id": client_id, "revenue": revenue}
+            for (month, client_id), revenue in paid.items()
+        ])
+def _insert_import_batch(kind, model, batch, report):
+    if kind == "invoices":
+        # An invoice imported as paid was paid in full, so it carries no balance
+        for _, row in batch:
+            row["amount_paid"] = row["amount"] if row["status"] == "paid" else 0.0
+    try:
+        db.session.execute(model.__table__.insert(), [row for _, row in batch])
+        _after_import_batch(kind, [row for _, row in batch])
+        db.session.commit()
+        report["inserted"] += len(batch)
+        return
+    except IntegrityError:
+        db.session.rollback()
+    # Retry one row at a time so the report can name the bad ones
+    for line, row in batch:
+        try:
+            db.session.execute(model.__table__.insert(), [row])
+            _after_import_batch(kind, [row])
+            db.session.commit()
+            report["inserted"] += 1
+        except IntegrityError as exc:
+            db.session.rollback()
+            _import_error(report, line, str(exc.orig))
+def _import_error(report, line, message):
+    report["failed"] += 1
+    if len(report["errors"]) < IMPORT_MAX_ERRORS:
+        report["errors"].append({"row": line, "error": message})
+def bulk_import(kind, stream, fmt):
+    """Import content items, effort logs or invoices from a CSV/JSON text stream.
+
+    Returns a report dict with inserted/failed counts and per-row errors
+    (row numbers are 1-based data rows).
+    """
+    model, spec = IMPORT_KINDS[kind]
+    clients_by_name = {name.strip().lower(): id_ for id_, name in db.session.query(Client.id, Client.name)}
+    client_ids = set(clients_by_name.values())
+    batch_size = current_app.config["IMPORT_BATCH_SIZE"]
+    report = {"kind": kind, "inserted": 0, "failed": 0, "errors": []}
+    batch = []
+    try:
+        for line, record in enumerate(iter_import_records(stream, fmt), start=1):
+            try:
+                batch.append((line, _parse_import_row(record, spec, clients_by_name, client_ids)))
+            except ValueError as exc:
+                _import_error(report, line, str(exc))
+                continue
+            if len(batch) >= batch_size:
+                _insert_import_batch(kind, model, batch, report)
+                batch = []
+    except (ValueError, csv.Error, UnicodeDecodeError) as exc:
+        report["aborted"] = str(exc)
+    if batch:
+        _insert_import_batch(kind, model, batch, report)
+    if report["inserted"] and kind in ("content", "invoices"):
+        sweep_overdue(force=True)  # imported rows may already be past due
+    return report
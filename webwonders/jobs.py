@@ -0,0 +1,107 @@
+import json
+import threading
+from flask import current_app, g, has_request_context
+from sqlalchemy import select
+from datetime import datetime, timedelta
+from .database import db
+from .models import Job
+# ----------------------
+# Background jobs
+# ----------------------
+# Derived writes that a form POST does not need to wait for (rollup updates,
+# overdue checks) are queued as Job rows in the request's own transaction and
+# run right after the response by a thread in the same worker, or by
+# `flask run-jobs`. A job and its effects commit together, and its handler
+# only applies deltas captured at enqueue time, so a retried or late job
+# never double counts. The search index stays in its triggers and cache
+# invalidation stays inline: both are cheaper than queueing them.
+JOB_HANDLERS = {}
+_job_wakeup = threading.Event()
+_job_worker_lock = threading.Lock()
+_job_worker_started = False
+def job_handler(name):
+    """Register ``fn(**payload)`` to run jobs called ``name``; it raises to have the job retried."""
+    def register(fn):
+        JOB_HANDLERS[name] = fn
+        return fn
+    return register
+def enqueue_job(name, payload, key=None):
+    """Queue a background job in the current transaction (caller commits).
+
+    ``payload`` is JSON-encoded with dates as ISO strings. A job whose
+    idempotency ``key`` was already queued is skipped; returns whether it was added.
+    """
+    if key and db.session.query(Job.id).filter_by(idempotency_key=key).first() is not None:
+        return False
+    db.session.add(Job(name=name, payload=json.dumps(payload, default=str), idempotency_key=key))
+    if has_request_context():
+        g.jobs_queued = True
+    return True
+def wake_job_worker(response):
+    if g.get("jobs_queued"):
+        _job_wakeup.set()
+    return response
+def run_jobs(limit=100):
+    """Run up to ``limit`` due jobs, oldest first; returns (done, failed).
+
+    A job is claimed by bumping its attempt count and leasing it for a few
+    minutes, so two runners never run it at once; a crashed runner's job is
+    picked up again when the lease runs out.
+    """
+    now = datetime.utcnow()
+    due = db.session.execute(
+        select(Job.id, Job.attempts).where(Job.status == "queued", Job.run_after <= now).order_by(Job.id).limit(limit)
+    ).all()
+    db.session.commit()  # a writer's lookup holds the write lock; do not keep it while idle
+    done = failed = 0
+    for job_id, attempts in due:
+        claimed = Job.query.filter_by(id=job_id, status="queued", attempts=attempts).update({
+            Job.attempts: attempts + 1,
+            Job.run_after: now + timedelta(minutes=5),
+        }, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            continue
+        job = db.session.get(Job, job_id)
+        try:
+            JOB_HANDLERS[job.name](**json.loads(job.payload))
+            job.status = "done"
+            job.finished_at = datetime.utcnow()
+            job.last_error = None
+            db.session.commit()
+            done += 1
+        except Exception as exc:
+            db.session.rollback()
+            current_app.logger.warning("Job %d (%s) failed: %s", job_id, job.name, exc)
+            job = db.session.get(Job, job_id)
+            job.last_error = "%s: %s" % (type(exc).__name__, exc)
+            if job.attempts >= current_app.config["JOB_MAX_ATTEMPTS"]:
+                job.status = "failed"
+                job.finished_at = datetime.utcnow()
+            else:
+                job.run_after = datetime.utcnow() + timedelta(seconds=current_app.config["JOB_RETRY_DELAY"] * 2 ** attempts)
+            db.session.commit()
+            failed += 1
+    return done, failed
+def _job_worker_loop(app):
+    while True:
+        _job_wakeup.wait(30)
+        _job_wakeup.clear()
+        with app.app_context():
+            g.writes = True
+            try:
+                while any(run_jobs()):
+                    pass
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Job runner failed")
+def start_job_worker():
+    """Start the background job thread once per worker process."""
+    global _job_worker_started
+    if _job_worker_started or not current_app.config["JOB_WORKER"]:
+        return
+    with _job_worker_lock:
+        if not _job_worker_started:
+            threading.Thread(target=_job_worker_loop, args=(current_app._get_current_object(),),
+                             name="job-runner", daemon=True).start()
+            _job_worker_started = True
@@ -0,0 +1,115 @@
+import threading
+import time
+from flask import (
+    Blueprint, Response, before_render_template, current_app, g, has_request_context, template_rendered,
+    request,
+)
+from sqlalchemy import event
+# ----------------------
+# Instrumentation
+# ----------------------
+# Every request records its duration, SQL statement count, DB time and
+# template render time into in-process histograms served by /metrics in the
+# Prometheus text format. Each worker process keeps its own numbers.
+# name: (type, histogram buckets, help)
+METRICS = {
+    "request_duration_seconds": ("histogram", (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+                                 "Time from the start of a request to its response, by route and status."),
+    "request_sql_statements": ("histogram", (1, 2, 5, 10, 20, 50, 100, 200, 500),
+                               "SQL statements issued per request, by route."),
+    "request_sql_seconds_total": ("counter", (), "Time spent executing SQL during requests, by route."),
+    "request_template_seconds_total": ("counter", (), "Time spent rendering templates during requests, by route."),
+}
+bp = Blueprint("metrics", __name__)
+_metrics = {}  # (name, labels) -> [bucket counts, sum, count]
+_metrics_lock = threading.Lock()
+def _observe(name, labels, value):
+    buckets = METRICS[name][1]
+    with _metrics_lock:
+        series = _metrics.get((name, labels))
+        if series is None:
+            series = _metrics[name, labels] = [[0] * len(buckets), 0.0, 0]
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+def track_queries(engine, app):
+    """Count and time ``engine``'s statements for the request metrics and log the slow ones.
+
+    The threshold and logger are taken from ``app`` up front, as a streamed
+    response may run its queries after the app context has gone.
+    """
+    threshold, logger = app.config["SLOW_QUERY_MS"], app.logger
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if has_request_context() and "request_started" in g:
+            g.sql_count += 1
+            g.sql_time += elapsed
+        if threshold and elapsed * 1000 >= threshold:
+            logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split()))
+@before_render_template.connect
+def _before_render(sender, template, context, **extra):
+    if "request_started" in g:
+        g.template_started = time.perf_counter()
+@template_rendered.connect
+def _after_render(sender, template, context, **extra):
+    if "template_started" in g:
+        g.template_time += time.perf_counter() - g.pop("template_started")
+@bp.before_app_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.sql_count = 0
+    g.sql_time = 0.0
+    g.template_time = 0.0
+@bp.after_app_request
+def record_request_metrics(response):
+    if "request_started" not in g or request.endpoint in (None, "static"):
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    labels = (("endpoint", request.endpoint), ("method", request.method), ("status", str(response.status_code)))
+    route = labels[:1]
+    _observe("request_duration_seconds", labels, elapsed)
+    _observe("request_sql_statements", route, g.sql_count)
+    _observe("request_sql_seconds_total", route, g.sql_time)
+    _observe("request_template_seconds_total", route, g.template_time)
+    if current_app.config["SERVER_TIMING"] or current_app.debug:
+        response.headers["Server-Timing"] = 'db;dur=%.1f;desc="%d queries", tpl;dur=%.1f, total;dur=%.1f' % (
+            g.sql_time * 1000, g.sql_count, g.template_time * 1000, elapsed * 1000)
+    return response
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+def _metric_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    return "{%s}" % ",".join('%s="%s"' % (k, _escape_label(v)) for k, v in pairs) if pairs else ""
+def render_metrics():
+    """All recorded series in the Prometheus text exposition format."""
+    with _metrics_lock:
+        snapshot = sorted((key, [list(s[0]), s[1], s[2]]) for key, s in _metrics.items())
+    lines = []
+    for name, (kind, buckets, help_text) in METRICS.items():
+        full_name = "webwonders_" + name
+        lines += ["# HELP %s %s" % (full_name, help_text), "# TYPE %s %s" % (full_name, kind)]
+        for (series_name, labels), (counts, total, count) in snapshot:
+            if series_name != name:
+                continue
+            if kind == "counter":
+                lines.append("%s%s %r" % (full_name, _metric_labels(labels), total))
+                continue
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append("%s_bucket%s %d" % (full_name, _metric_labels(labels, [("le", bound)]), bucket_count))
+            lines.append("%s_bucket%s %d" % (full_name, _metric_labels(labels, [("le", "+Inf")]), count))
+            lines.append("%s_sum%s %r" % (full_name, _metric_labels(labels), total))
+            lines.append("%s_count%s %d" % (full_name, _metric_labels(labels), count))
+    return "\n".join(lines) + "\n"
+@bp.route("/metrics")
+def metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
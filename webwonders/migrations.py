@@ -0,0 +1,143 @@
+import click
+from sqlalchemy import func, inspect, select
+from datetime import datetime
+from .database import db
+from .models import ClientInvoice, ClientPayment, ContentItem, EffortLog, Employee, SchemaVersion
+from .search import SEARCH_INDEX_DDL, rebuild_search_index
+from .scorecard import refresh_client_metrics
+from .analytics import rebuild_effort_rollups, rebuild_ledger, rebuild_revenue_rollups
+# ----------------------
+# Schema migrations
+# ----------------------
+# db.create_all() only creates missing tables, so changes to existing tables
+# (new indexes, columns) are versioned here and applied by `flask init-db`.
+MIGRATIONS = []
+def migration(version, description):
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return decorator
+def add_column(conn, model, name):
+    """ALTER TABLE ADD COLUMN for a model column unless the table already has it."""
+    table = model.__table__
+    if name in {c["name"] for c in inspect(conn).get_columns(table.name)}:
+        return False
+    column = table.c[name]
+    ddl = "ALTER TABLE %s ADD COLUMN %s %s" % (table.name, column.name, column.type.compile(conn.dialect))
+    if column.server_default is not None:
+        ddl += " DEFAULT %s" % column.server_default.arg
+    if not column.nullable:
+        ddl += " NOT NULL"
+    conn.exec_driver_sql(ddl)
+    return True
+def create_indexes(conn, *names):
+    """Create the named model indexes unless they already exist."""
+    indexes = {ix.name: ix for table in db.metadata.tables.values() for ix in table.indexes}
+    for name in names:
+        indexes[name].create(conn, checkfirst=True)
+HOT_FILTER_INDEXES = (
+    "ix_content_item_date",
+    "ix_content_item_status_date",
+    "ix_content_item_client_date",
+    "ix_effort_log_date_client",
+    "ix_task_status_assignee_due",
+    "ix_task_assignee_due",
+    "ix_client_invoice_status_due",
+    "ix_client_invoice_client_due",
+    "ix_client_payment_invoice",
+)
+@migration(1, "Indexes for the date/status hot filters")
+def add_hot_filter_indexes(conn):
+    create_indexes(conn, *HOT_FILTER_INDEXES)
+@migration(2, "Backfill revenue rollups")
+def backfill_revenue_rollups(conn):
+    rebuild_revenue_rollups()
+@migration(3, "Full-text search index")
+def add_search_index(conn):
+    if conn.dialect.name != "sqlite":
+        return
+    for statement in SEARCH_INDEX_DDL:
+        conn.exec_driver_sql(statement)
+    rebuild_search_index(conn)
+@migration(4, "One invoice per client and month")
+def add_invoice_month_unique_index(conn):
+    duplicates = conn.execute(
+        select(ClientInvoice.client_id, ClientInvoice.month)
+        .group_by(ClientInvoice.client_id, ClientInvoice.month)
+        .having(func.count() > 1)
+    ).all()
+    if duplicates:
+        raise click.ClickException(
+            "Cannot add the one-invoice-per-month constraint; merge the duplicate invoices for "
+            + ", ".join("client %s in %s" % tuple(row) for row in duplicates[:20])
+            + (" and %d more" % (len(duplicates) - 20) if len(duplicates) > 20 else "")
+            + " and run `flask init-db` again."
+        )
+    create_indexes(conn, "uq_client_invoice_client_month")
+@migration(5, "Denormalized invoice amount_paid")
+def add_invoice_amount_paid(conn):
+    if add_column(conn, ClientInvoice, "amount_paid"):
+        paid = select(func.coalesce(func.sum(ClientPayment.amount), 0)).where(
+            ClientPayment.invoice_id == ClientInvoice.id
+        ).scalar_subquery()
+        conn.execute(ClientInvoice.__table__.update().values(amount_paid=paid))
+@migration(6, "Content item updated_at")
+def add_content_item_updated_at(conn):
+    if add_column(conn, ContentItem, "updated_at"):
+        conn.execute(ContentItem.__table__.update().values(updated_at=datetime.utcnow()))
+@migration(7, "Backfill effort rollups")
+def backfill_effort_rollups(conn):
+    rebuild_effort_rollups()
+@migration(8, "Backfill ledger rollups")
+def backfill_ledger_rollups(conn):
+    rebuild_ledger()
+@migration(9, "Effort log employee and workload indexes")
+def add_workload_columns(conn):
+    add_column(conn, EffortLog, "employee_id")
+    add_column(conn, Employee, "weekly_capacity_hours")
+    create_indexes(conn, "ix_effort_log_date_employee", "ix_task_status_assignee_priority_due")
+@migration(10, "Client scorecards")
+def backfill_client_metrics(conn):
+    create_indexes(conn, "ix_content_item_client_status", "ix_client_payment_client_date")
+    refresh_client_metrics()
+@migration(11, "Settle imported paid invoices")
+def settle_imported_paid_invoices(conn):
+    table = ClientInvoice.__table__
+    conn.execute(table.update().where(table.c.status == "paid", table.c.amount_paid < table.c.amount).values(
+        amount_paid=table.c.amount))
+@migration(12, "Zero-padded invoice months")
+def normalize_invoice_months(conn):
+    table = ClientInvoice.__table__
+    rows = conn.execute(select(table.c.id, table.c.client_id, table.c.month).where(func.length(table.c.month) != 7)).all()
+    fixed = {}
+    for invoice_id, client_id, month in rows:
+        year, _, number = month.partition("-")
+        fixed[invoice_id] = (client_id, "%04d-%02d" % (int(year), int(number)))
+    taken = set(conn.execute(select(table.c.client_id, table.c.month).where(
+        table.c.client_id.in_({client_id for client_id, _ in fixed.values()}))).all())
+    clashes = sorted(key for key in fixed.values() if key in taken)
+    if clashes:
+        raise click.ClickException(
+            "Cannot normalize invoice months; merge the duplicate invoices for "
+            + ", ".join("client %s in %s" % key for key in clashes[:20])
+            + (" and %d more" % (len(clashes) - 20) if len(clashes) > 20 else "")
+            + " and run `flask init-db` again."
+        )
+    for invoice_id, (_, month) in fixed.items():
+        conn.execute(table.update().where(table.c.id == invoice_id).values(month=month))
+def run_migrations():
+    """Create missing tables and apply pending migrations in version order.
+
+    Returns the (version, description) pairs that were applied.
+    """
+    db.create_all()
+    current = db.session.query(func.max(SchemaVersion.version)).scalar() or 0
+    applied = []
+    for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version <= current:
+            continue
+        fn(db.session.connection())
+        db.session.add(SchemaVersion(version=version, description=description))
+        db.session.commit()
+        applied.append((version, description))
+    return applied
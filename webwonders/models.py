@@ -0,0 +1,209 @@
+from sqlalchemy.ext.hybrid import hybrid_property
+from datetime import datetime, date
+from .database import db
+# ----------------------
+# Database Models
+# ----------------------
+class Client(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    brand_name = db.Column(db.String(120))
+    start_date = db.Column(db.Date, default=date.today)
+    monthly_retainer = db.Column(db.Float, default=0.0)
+    status = db.Column(db.String(20), default="active")  # active / paused / closed
+    notes = db.Column(db.Text)
+    content_items = db.relationship("ContentItem", backref="client", lazy=True)
+    efforts = db.relationship("EffortLog", backref="client", lazy=True)
+    invoices = db.relationship("ClientInvoice", backref="client", lazy=True)
+    metrics = db.relationship("ClientMetrics", uselist=False, lazy=True)
+class Employee(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    role = db.Column(db.String(120))
+    email = db.Column(db.String(120))
+    status = db.Column(db.String(20), default="active")
+    weekly_capacity_hours = db.Column(db.Float)  # None: WEEKLY_CAPACITY_HOURS
+    tasks = db.relationship("Task", backref="assignee", lazy=True)
+    efforts = db.relationship("EffortLog", backref="employee", lazy=True)
+class ContentItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey("client.id"), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    platform = db.Column(db.String(50))
+    content_type = db.Column(db.String(50))  # post, reel, story, blog, email
+    title = db.Column(db.String(200))
+    caption = db.Column(db.Text)
+    status = db.Column(db.String(20), default="planned")  # planned, done, overdue, skipped
+    posted_url = db.Column(db.String(255))
+    remarks = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __table_args__ = (
+        db.Index("ix_content_item_date", "date"),
+        db.Index("ix_content_item_status_date", "status", "date"),
+        db.Index("ix_content_item_client_date", "client_id", "date"),
+        db.Index("ix_content_item_client_status", "client_id", "status"),
+    )
+class EffortLog(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey("client.id"), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    posts_count = db.Column(db.Integer, default=0)
+    reels_count = db.Column(db.Integer, default=0)
+    time_minutes = db.Column(db.Integer, default=0)
+    notes = db.Column(db.Text)
+    employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=True)
+    __table_args__ = (
+        db.Index("ix_effort_log_date_client", "date", "client_id"),
+        # Covers the workload hours query: a date range grouped by employee and client
+        db.Index("ix_effort_log_date_employee", "date", "employee_id", "client_id", "time_minutes"),
+    )
+class Task(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    client_id = db.Column(db.Integer, db.ForeignKey("client.id"), nullable=True)
+    assigned_to = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=True)
+    status = db.Column(db.String(20), default="pending")  # pending, in_progress, completed, overdue
+    priority = db.Column(db.String(20), default="medium")  # low, medium, high
+    due_date = db.Column(db.Date, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    client = db.relationship("Client", lazy=True)
+    __table_args__ = (
+        db.Index("ix_task_status_assignee_due", "status", "assigned_to", "due_date"),
+        db.Index("ix_task_assignee_due", "assigned_to", "due_date"),
+        # Covers the workload open-task counts by assignee, priority and due date
+        db.Index("ix_task_status_assignee_priority_due", "status", "assigned_to", "priority", "due_date"),
+    )
+class ClientInvoice(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey("client.id"), nullable=False)
+    month = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    amount = db.Column(db.Float, nullable=False)
+    due_date = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), default="pending")  # pending, paid, overdue
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    amount_paid = db.Column(db.Float, nullable=False, default=0.0, server_default="0")  # maintained by record_payment()
+    payments = db.relationship("ClientPayment", backref="invoice", lazy=True)
+    @hybrid_property
+    def balance(self):
+        return self.amount - self.amount_paid
+    __table_args__ = (
+        db.Index("ix_client_invoice_status_due", "status", "due_date"),
+        db.Index("ix_client_invoice_client_due", "client_id", "due_date"),
+        db.Index("uq_client_invoice_client_month", "client_id", "month", unique=True),
+    )
+class ClientPayment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey("client.id"), nullable=False)
+    invoice_id = db.Column(db.Integer, db.ForeignKey("client_invoice.id"), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    payment_date = db.Column(db.Date, nullable=False)
+    mode = db.Column(db.String(50))  # cash, bank_transfer, upi, card
+    reference = db.Column(db.String(120))
+    notes = db.Column(db.Text)
+    __table_args__ = (
+        db.Index("ix_client_payment_invoice", "invoice_id"),
+        db.Index("ix_client_payment_client_date", "client_id", "payment_date"),
+    )
+class PaymentOut(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    vendor_name = db.Column(db.String(120), nullable=False)
+    related_client_id = db.Column(db.Integer, db.ForeignKey("client.id"), nullable=True)
+    amount = db.Column(db.Float, nullable=False)
+    payment_date = db.Column(db.Date, nullable=False)
+    mode = db.Column(db.String(50))
+    category = db.Column(db.String(50))  # software, salary, ads, others
+    notes = db.Column(db.Text)
+class Projection(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    period_type = db.Column(db.String(20), default="monthly")  # monthly, quarterly, yearly
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    target_revenue = db.Column(db.Float, nullable=False)
+    target_clients_count = db.Column(db.Integer, nullable=False)
+    description = db.Column(db.Text)
+class RevenueRollup(db.Model):
+    # Paid invoice amounts per due-date month and client, kept up to date by accounts_pay()
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM of the invoice due date
+    client_id = db.Column(db.Integer, db.ForeignKey("client.id"), primary_key=True)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+class EffortRollup(db.Model):
+    # Effort log totals per day and client, kept up to date by record_effort_logs()
+    day = db.Column(db.Date, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey("client.id"), primary_key=True)
+    week = db.Column(db.Date, nullable=False)  # Monday of the day's week
+    month = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+    posts = db.Column(db.Integer, nullable=False, default=0)
+    reels = db.Column(db.Integer, nullable=False, default=0)
+class LedgerRollup(db.Model):
+    # Cash in (client payments), cash out (PaymentOut) and logged effort per month, client and category
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM of the payment or effort date
+    client_id = db.Column(db.Integer, primary_key=True)  # 0 when not tied to a client
+    category = db.Column(db.String(50), primary_key=True)  # "client_payment" for money in, "effort" for minutes
+    cash_in = db.Column(db.Float, nullable=False, default=0.0)
+    cash_out = db.Column(db.Float, nullable=False, default=0.0)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+    entries = db.Column(db.Integer, nullable=False, default=0)
+class ClientMetrics(db.Model):
+    # One scorecard row per client, recomputed by refresh_client_metrics() when its rows change
+    client_id = db.Column(db.Integer, db.ForeignKey("client.id"), primary_key=True)
+    content_planned = db.Column(db.Integer, nullable=False, default=0)
+    content_done = db.Column(db.Integer, nullable=False, default=0)
+    content_overdue = db.Column(db.Integer, nullable=False, default=0)
+    content_skipped = db.Column(db.Integer, nullable=False, default=0)
+    delivery_rate = db.Column(db.Float)  # done / (done + overdue + skipped); None until an item is due
+    effort_minutes = db.Column(db.Integer, nullable=False, default=0)  # over the last SCORECARD_EFFORT_DAYS days
+    retainer_per_hour = db.Column(db.Float)  # monthly retainer / those hours; None without effort
+    outstanding_balance = db.Column(db.Float, nullable=False, default=0.0)
+    overdue_balance = db.Column(db.Float, nullable=False, default=0.0)
+    last_payment_date = db.Column(db.Date)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+class SchemaVersion(db.Model):
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200))
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+class SweepState(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    last_swept = db.Column(db.Date, nullable=False)
+class OutboxMessage(db.Model):
+    # Notifications waiting for drain_outbox(); dedupe_key stops a message being queued twice
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # due_soon
+    employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=True)
+    recipient = db.Column(db.String(120))
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    dedupe_key = db.Column(db.String(120), unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)  # also leases a claimed message
+    last_error = db.Column(db.Text)
+    sent_at = db.Column(db.DateTime)
+    __table_args__ = (
+        db.Index("ix_outbox_message_pending", "sent_at", "next_attempt_at"),
+    )
+class Job(db.Model):
+    # Background work queued by enqueue_job() in the same transaction as the write it follows
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON keyword arguments for the handler
+    idempotency_key = db.Column(db.String(120), unique=True)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # also leases a claimed job
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    __table_args__ = (
+        db.Index("ix_job_status_run_after", "status", "run_after"),
+    )
+CONTENT_STATUSES = ("planned", "done", "overdue", "skipped")
+TASK_STATUSES = ("pending", "in_progress", "completed", "overdue")
+def set_status(model, ids, status):
+    """Set ``status`` on the rows with these ids in one UPDATE (caller commits).
+
+    Returns the number of rows updated.
+    """
+    return model.query.filter(model.id.in_(ids)).update({model.status: status}, synchronize_session=False)
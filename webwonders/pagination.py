@@ -0,0 +1,76 @@
+import base64
+import json
+from flask import abort, current_app, request, url_for
+from sqlalchemy import and_, func, or_, tuple_
+from sqlalchemy.orm import joinedload
+from datetime import date
+from .database import db
+from .models import Client, ClientInvoice, ContentItem, EffortLog, Task
+# ----------------------
+# List queries
+# ----------------------
+# List views render the related client/assignee name for every row, so these
+# queries load them in the same SELECT instead of one lazy SELECT per row.
+def content_item_query():
+    return ContentItem.query.options(joinedload(ContentItem.client))
+def effort_log_query():
+    return EffortLog.query.options(joinedload(EffortLog.client), joinedload(EffortLog.employee))
+def invoice_query():
+    return ClientInvoice.query.options(joinedload(ClientInvoice.client))
+def task_query():
+    return Task.query.options(joinedload(Task.client), joinedload(Task.assignee))
+# ----------------------
+# Keyset pagination
+# ----------------------
+# List views page with "after" tokens holding the sort key of the last row
+# shown, so each page is an index range scan instead of an OFFSET that gets
+# slower (and shifts under inserts) the deeper you go.
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, date) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+def decode_cursor(token, order):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+        if len(values) != len(order):
+            raise ValueError(token)
+        return [
+            date.fromisoformat(v) if isinstance(expr.type, db.Date) else v
+            for (expr, _), v in zip(order, values)
+        ]
+    except (ValueError, TypeError):
+        abort(400, "Invalid page token")
+def _after(order, values):
+    if all(desc == order[0][1] for _, desc in order):
+        cols = tuple_(*(expr for expr, _ in order))
+        vals = tuple_(*values)
+        return cols < vals if order[0][1] else cols > vals
+    clauses = []
+    for i, (expr, desc) in enumerate(order):
+        ties = [order[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*ties, expr < values[i] if desc else expr > values[i]))
+    return or_(*clauses)
+def keyset_page(query, order, after=None, per_page=None):
+    """Fetch one page of ``query`` sorted by ``order``, starting after the ``after`` token.
+
+    ``order`` is a list of (expression, descending) pairs ending in a unique
+    column. Returns (rows, next_token); next_token is None on the last page.
+    """
+    per_page = per_page or current_app.config["PAGE_SIZE"]
+    if after:
+        query = query.filter(_after(order, decode_cursor(after, order)))
+    query = query.add_columns(*(expr for expr, _ in order))
+    query = query.order_by(*(expr.desc() if desc else expr for expr, desc in order))
+    rows = query.limit(per_page + 1).all()
+    next_token = encode_cursor(rows[per_page - 1][1:]) if len(rows) > per_page else None
+    return [row[0] for row in rows[:per_page]], next_token
+def url_with_args(**changes):
+    """URL of the current page with some query args replaced (None drops one)."""
+    args = request.args.to_dict()
+    args.update(changes)
+    args = {k: v for k, v in args.items() if v is not None}
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+CLIENT_ORDER = [(Client.name, False), (Client.id, False)]
+INVOICE_ORDER = [(ClientInvoice.due_date, True), (ClientInvoice.id, True)]
+TASK_ORDER = [(func.coalesce(Task.due_date, date.max), False), (Task.id, False)]  # undated tasks last
+EFFORT_LOG_ORDER = [(EffortLog.date, True), (EffortLog.id, True)]
+CONTENT_ITEM_ORDER = [(ContentItem.date, True), (ContentItem.id, True)]
@@ -0,0 +1,75 @@
+import json
+from flask import Response, abort
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from datetime import date, timedelta
+from .models import ContentItem
+from .analytics import month_end, parse_month, snapshot_row
+# ----------------------
+# Planner calendar
+# ----------------------
+PLANNER_VIEWS = ("week", "month", "range")
+# Longest custom range the planner will bucket
+PLANNER_MAX_DAYS = 366
+def planner_period(args, today, default="month"):
+    """Resolve ?view= (``default`` if absent) with ?month=YYYY-MM or ?start=/?end= to (view, start, end).
+
+    Weeks run Monday to Sunday around ``start``; unparseable dates fall back to today.
+    """
+    view = args.get("view", default)
+    if view == "week":
+        anchor = args.get("start", type=date.fromisoformat) or today
+        start = anchor - timedelta(days=anchor.weekday())
+        return view, start, start + timedelta(days=6)
+    if view == "range":
+        start = args.get("start", type=date.fromisoformat) or today
+        end = args.get("end", type=date.fromisoformat) or start + timedelta(days=6)
+        if end < start or (end - start).days >= PLANNER_MAX_DAYS:
+            abort(400, "Choose an end date on or after the start, at most %d days later." % (PLANNER_MAX_DAYS - 1))
+        return view, start, end
+    start = args.get("month", type=parse_month) or today.replace(day=1)
+    return "month", start, month_end(start)
+def _planner_query(start, end, client_id):
+    query = ContentItem.query.filter(ContentItem.date >= start, ContentItem.date <= end)
+    if client_id:
+        query = query.filter(ContentItem.client_id == client_id)
+    return query
+def planner_calendar(start, end, client_id=None):
+    """Content items from ``start`` to ``end`` bucketed per day and per client.
+
+    ``days`` has an entry for every date in the range, empty or not, so a
+    calendar can lay out its grid straight from it.
+    """
+    days = {start + timedelta(days=n): [] for n in range((end - start).days + 1)}
+    by_client = {}
+    items = _planner_query(start, end, client_id).options(joinedload(ContentItem.client))
+    for item in items.order_by(ContentItem.date, ContentItem.id):
+        row = snapshot_row(item)
+        days[item.date].append(row)
+        bucket = by_client.setdefault(item.client_id, {"client": row["client"], "days": {}})
+        bucket["days"].setdefault(item.date, []).append(row)
+    return {
+        "start": start,
+        "end": end,
+        "days": days,
+        "by_client": sorted(by_client.values(), key=lambda bucket: bucket["client"]["name"]),
+    }
+def planner_freshness(start, end, client_id=None):
+    """(item count, latest updated_at) for a range; moves whenever its items change."""
+    return _planner_query(start, end, client_id).with_entities(
+        func.count(ContentItem.id), func.max(ContentItem.updated_at)
+    ).one()
+def json_response(payload, status=200):
+    """JSON response that writes dates and datetimes as ISO 8601."""
+    return Response(json.dumps(payload, default=lambda v: v.isoformat()), status=status, mimetype="application/json")
+def calendar_json(calendar, clients):
+    def days(buckets):
+        return [{"date": day, "items": items} for day, items in buckets.items()]
+    payload = {
+        "start": calendar["start"],
+        "end": calendar["end"],
+        "days": days(calendar["days"]),
+        "by_client": [{"client": b["client"], "days": days(b["days"])} for b in calendar["by_client"]],
+        "clients": clients,
+    }
+    return payload
@@ -0,0 +1,292 @@
+import itertools
+import threading
+import time
+from flask import current_app, g
+from sqlalchemy import select
+from datetime import datetime, date, timedelta
+from .database import db
+from .models import Client, ClientInvoice, ContentItem, Employee, Job, OutboxMessage, SweepState, Task
+from .jobs import enqueue_job, job_handler
+from .scorecard import queue_client_metrics, refresh_client_metrics
+# ----------------------
+# Overdue sweep
+# ----------------------
+_last_swept = {}  # per-process memo of SweepState, saves the lookup after today's sweep
+_sweeper_lock = threading.Lock()
+_sweeper_started = False
+def _swept_today(name, today):
+    """Whether the daily job ``name`` already ran for ``today`` in any worker."""
+    if _last_swept.get(name) == today:
+        return True
+    state = db.session.get(SweepState, name)
+    if state and state.last_swept >= today:
+        _last_swept[name] = state.last_swept
+        return True
+    return False
+def _mark_swept(name, today):
+    """Record that the daily job ``name`` ran for ``today`` (caller commits)."""
+    state = db.session.get(SweepState, name)
+    if state is None:
+        state = SweepState(name=name, last_swept=today)
+        db.session.add(state)
+    state.last_swept = today
+def sweep_overdue(today=None, force=False):
+    """Mark past-due content items, invoices and open tasks as overdue.
+
+    Runs as three set-based UPDATEs and at most once per day: the date of the
+    last sweep is stored in SweepState so every worker skips it until tomorrow.
+    Returns (items, invoices, tasks) updated, or None if today was already swept.
+    """
+    today = today or date.today()
+    if not force and _swept_today("overdue", today):
+        return None
+    items = ContentItem.query.filter(
+        ContentItem.status.notin_(["done", "skipped", "overdue"]),
+        ContentItem.date < today
+    ).update({ContentItem.status: "overdue"}, synchronize_session=False)
+    invoices = ClientInvoice.query.filter(
+        ClientInvoice.status.notin_(["paid", "overdue"]),
+        ClientInvoice.due_date < today
+    ).update({ClientInvoice.status: "overdue"}, synchronize_session=False)
+    tasks = Task.query.filter(
+        Task.status.in_(["pending", "in_progress"]),
+        Task.due_date < today
+    ).update({Task.status: "overdue"}, synchronize_session=False)
+    if items or invoices:
+        queue_client_metrics()
+    _mark_swept("overdue", today)
+    db.session.commit()
+    _last_swept["overdue"] = today
+    return items, invoices, tasks
+def refresh_daily_client_metrics(today=None, force=False):
+    """Recompute every client's scorecard, at most once per day, so its effort window follows the date.
+
+    Returns the number of rows written, or None if today's refresh already ran.
+    """
+    today = today or date.today()
+    if not force and _swept_today("client_metrics", today):
+        return None
+    count = refresh_client_metrics(today=today)
+    _mark_swept("client_metrics", today)
+    db.session.commit()
+    _last_swept["client_metrics"] = today
+    return count
+def purge_finished_rows(today=None, force=False):
+    """Delete done jobs and sent outbox messages older than RETENTION_DAYS, at most once per day.
+
+    Failed jobs and undelivered messages are kept for inspection. Returns
+    (jobs, messages) deleted, or None if today's cleanup already ran.
+    """
+    today = today or date.today()
+    if not force and _swept_today("retention", today):
+        return None
+    cutoff = datetime.combine(today - timedelta(days=current_app.config["RETENTION_DAYS"]), datetime.min.time())
+    jobs = Job.query.filter(Job.status == "done", Job.finished_at < cutoff).delete(synchronize_session=False)
+    messages = OutboxMessage.query.filter(OutboxMessage.sent_at < cutoff).delete(synchronize_session=False)
+    _mark_swept("retention", today)
+    db.session.commit()
+    _last_swept["retention"] = today
+    return jobs, messages
+def run_scheduled_jobs(today=None):
+    """The daily jobs: the overdue sweep, the client scorecard refresh, the due-soon digests, then the cleanup.
+
+    All are once-a-day and safe to call from every worker and `flask scheduler`.
+    """
+    sweep_overdue(today)
+    refresh_daily_client_metrics(today)
+    queue_due_soon_digests(today)
+    purge_finished_rows(today)
+def _sweeper_loop(app):
+    while True:
+        with app.app_context():
+            g.writes = True
+            try:
+                run_scheduled_jobs()
+                while drain_outbox()[0]:
+                    pass
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Scheduled jobs failed")
+        time.sleep(app.config["SWEEPER_INTERVAL"])
+def start_sweeper():
+    """Start the overdue sweeper thread once per worker process."""
+    global _sweeper_started
+    if _sweeper_started or not current_app.config["SWEEPER_INTERVAL"]:
+        return
+    with _sweeper_lock:
+        if not _sweeper_started:
+            threading.Thread(target=_sweeper_loop, args=(current_app._get_current_object(),),
+                             name="overdue-sweeper", daemon=True).start()
+            _sweeper_started = True
+# ----------------------
+# Notifications
+# ----------------------
+# Notifications are queued as OutboxMessage rows in the same transaction as
+# the data they describe and delivered later by drain_outbox(), so a slow or
+# failing mail server never holds up a request or a sweep. Senders are plain
+# functions registered under a name and picked by NOTIFICATION_SENDER.
+NOTIFICATION_SENDERS = {}
+def notification_sender(name):
+    """Register ``fn(message)`` as a sender; it raises to report a failed delivery."""
+    def register(fn):
+        NOTIFICATION_SENDERS[name] = fn
+        return fn
+    return register
+@notification_sender("log")
+def send_to_log(message):
+    current_app.logger.info("Notification for %s: %s\n%s", message.recipient or "-", message.subject, message.body)
+@notification_sender("file")
+def send_to_file(message):
+    with open(current_app.config["NOTIFICATION_FILE"], "a", encoding="utf-8") as fh:
+        fh.write("To: %s\nSubject: %s\nDate: %s\n\n%s\n\n" % (
+            message.recipient or "-", message.subject, datetime.utcnow().isoformat(timespec="seconds"), message.body))
+@notification_sender("smtp")
+def send_smtp(message):
+    import smtplib
+    from email.message import EmailMessage
+    if not message.recipient:
+        raise ValueError("no email address")
+    mail = EmailMessage()
+    mail["From"] = current_app.config["SMTP_FROM"]
+    mail["To"] = message.recipient
+    mail["Subject"] = message.subject
+    mail.set_content(message.body)
+    with smtplib.SMTP(current_app.config["SMTP_HOST"], current_app.config["SMTP_PORT"], timeout=30) as smtp:
+        smtp.send_message(mail)
+def queue_notifications(messages):
+    """Add OutboxMessage rows, skipping any whose dedupe_key is already queued (caller commits).
+
+    Returns the number queued.
+    """
+    keys = [m["dedupe_key"] for m in messages if m.get("dedupe_key")]
+    seen = set(keys and db.session.scalars(
+        select(OutboxMessage.dedupe_key).where(OutboxMessage.dedupe_key.in_(keys))
+    ))
+    fresh = [m for m in messages if m.get("dedupe_key") not in seen]
+    db.session.add_all(OutboxMessage(**m) for m in fresh)
+    return len(fresh)
+def due_soon_tasks(today, days):
+    """Open tasks of active employees that are overdue or due within ``days``, by assignee then due date."""
+    return db.session.query(
+        Task.assigned_to, Employee.name, Employee.email, Task.title, Task.due_date, Task.status,
+        Task.priority, Client.name.label("client_name"),
+    ).join(Employee, Employee.id == Task.assigned_to).outerjoin(Client, Client.id == Task.client_id).filter(
+        Task.status.in_(["pending", "in_progress", "overdue"]),
+        Task.due_date <= today + timedelta(days=days),
+        Employee.status == "active",
+    ).order_by(Task.assigned_to, Task.due_date, Task.id).all()
+def queue_due_soon_digests(today=None, force=False):
+    """Queue one digest per employee listing their overdue and due-soon tasks.
+
+    Built from a single query and run at most once per day (tracked in
+    SweepState like the overdue sweep). Returns the number of digests queued,
+    or None if today's were already queued.
+    """
+    today = today or date.today()
+    if not force and _swept_today("due_soon", today):
+        return None
+    messages = []
+    for employee_id, rows in itertools.groupby(due_soon_tasks(today, current_app.config["DUE_SOON_DAYS"]), key=lambda r: r[0]):
+        rows = list(rows)
+        overdue = sum(1 for r in rows if r.due_date < today)
+        lines = ["%s  %-11s %-6s %s%s" % (
+            r.due_date, "OVERDUE" if r.due_date < today else r.status, r.priority or "",
+            r.title, " (%s)" % r.client_name if r.client_name else "",
+        ) for r in rows]
+        messages.append({
+            "kind": "due_soon",
+            "employee_id": employee_id,
+            "recipient": rows[0].email,
+            "subject": "%d tasks due soon, %d overdue" % (len(rows) - overdue, overdue),
+            "body": "Hi %s,\n\nYour open tasks due by %s:\n\n%s\n" % (
+                rows[0].name, today + timedelta(days=current_app.config["DUE_SOON_DAYS"]), "\n".join(lines)),
+            "dedupe_key": "due_soon:%d:%s" % (employee_id, today),
+        })
+    queued = queue_notifications(messages)
+    _mark_swept("due_soon", today)
+    db.session.commit()
+    _last_swept["due_soon"] = today
+    return queued
+def drain_outbox(batch_size=None, sender=None):
+    """Deliver one batch of unsent outbox messages, oldest first.
+
+    Each message is claimed by bumping its attempt count and leasing it for
+    a few minutes before it is sent, so two drainers never deliver the same
+    message. A failure keeps the error and the message is retried after
+    OUTBOX_RETRY_DELAY (doubling) until OUTBOX_MAX_ATTEMPTS. Returns (sent, failed).
+    """
+    send = NOTIFICATION_SENDERS[sender or current_app.config["NOTIFICATION_SENDER"]]
+    now = datetime.utcnow()
+    pending = db.session.execute(
+        select(OutboxMessage.id, OutboxMessage.attempts)
+        .where(OutboxMessage.sent_at.is_(None), OutboxMessage.next_attempt_at <= now,
+               OutboxMessage.attempts < current_app.config["OUTBOX_MAX_ATTEMPTS"])
+        .order_by(OutboxMessage.id)
+        .limit(batch_size or current_app.config["OUTBOX_BATCH_SIZE"])
+    ).all()
+    db.session.commit()  # a writer's lookup holds the write lock; do not keep it while idle
+    sent = failed = 0
+    for message_id, attempts in pending:
+        claimed = OutboxMessage.query.filter_by(id=message_id, attempts=attempts, sent_at=None).update({
+            OutboxMessage.attempts: attempts + 1,
+            OutboxMessage.next_attempt_at: now + timedelta(minutes=5),
+        }, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            continue
+        message = db.session.get(OutboxMessage, message_id)
+        try:
+            send(message)
+        except Exception as exc:
+            message.last_error = "%s: %s" % (type(exc).__name__, exc)
+            message.next_attempt_at = datetime.utcnow() + timedelta(
+                seconds=current_app.config["OUTBOX_RETRY_DELAY"] * 2 ** attempts)
+            failed += 1
+        else:
+            message.sent_at = datetime.utcnow()
+            message.last_error = None
+            sent += 1
+        db.session.commit()
+    return sent, failed
+def queue_overdue_check(row, today=None):
+    """Queue the overdue job for a content item, invoice or task that is already past due and still open.
+
+    Called when such a row is created or moved into the past, so its status
+    does not wait for the next daily sweep (caller commits; the row needs its id).
+    """
+    today = today or date.today()
+    if isinstance(row, ContentItem):
+        if row.date < today and row.status not in ("done", "skipped", "overdue"):
+            enqueue_job("content_overdue", {"item_id": row.id}, key="content_overdue:%d:%s" % (row.id, row.date))
+    elif isinstance(row, Task):
+        if row.due_date and row.due_date < today and row.status in ("pending", "in_progress"):
+            enqueue_job("task_overdue", {"task_id": row.id}, key="task_overdue:%d:%s" % (row.id, row.due_date))
+    elif row.due_date < today and row.status not in ("paid", "overdue"):
+        enqueue_job("invoice_overdue", {"invoice_id": row.id},
+                    key="invoice_overdue:%d:%s" % (row.id, row.due_date))
+@job_handler("content_overdue")
+def content_overdue_job(item_id):
+    """Mark one edited content item overdue if it is now past due and still open."""
+    if ContentItem.query.filter(
+        ContentItem.id == item_id,
+        ContentItem.status.notin_(["done", "skipped", "overdue"]),
+        ContentItem.date < date.today(),
+    ).update({ContentItem.status: "overdue"}, synchronize_session=False):
+        refresh_client_metrics([db.session.query(ContentItem.client_id).filter_by(id=item_id).scalar()])
+@job_handler("invoice_overdue")
+def invoice_overdue_job(invoice_id):
+    """Mark one new invoice overdue if it is past due and still unpaid."""
+    if ClientInvoice.query.filter(
+        ClientInvoice.id == invoice_id,
+        ClientInvoice.status.notin_(["paid", "overdue"]),
+        ClientInvoice.due_date < date.today(),
+    ).update({ClientInvoice.status: "overdue"}, synchronize_session=False):
+        refresh_client_metrics([db.session.query(ClientInvoice.client_id).filter_by(id=invoice_id).scalar()])
+@job_handler("task_overdue")
+def task_overdue_job(task_id):
+    """Mark one task overdue if it is past due and still open."""
+    Task.query.filter(
+        Task.id == task_id,
+        Task.status.in_(["pending", "in_progress"]),
+        Task.due_date < date.today(),
+    ).update({Task.status: "overdue"}, synchronize_session=False)
@@ -0,0 +1,108 @@
+from flask import current_app
+from sqlalchemy import case, func
+from datetime import datetime, date, timedelta
+from .database import db
+from .models import Client, ClientInvoice, ClientMetrics, ClientPayment, ContentItem, EffortRollup
+from .jobs import enqueue_job, job_handler
+from .pagination import CLIENT_ORDER
+# ----------------------
+# Client scorecard
+# ----------------------
+# Each client's delivery rate, recent effort against retainer, open balance
+# and last payment live precomputed in ClientMetrics. Writes that touch a
+# client's content, effort, invoices or payments queue a "client_metrics" job
+# for just those clients; the daily jobs refresh every row so the effort
+# window moves with the calendar. Pages then read one row per client by
+# primary key and sort on the stored columns instead of aggregating per request.
+SCORECARD_SORTS = {
+    "name": ("Name", CLIENT_ORDER),
+    "delivery": ("Lowest delivery rate", [
+        (func.coalesce(ClientMetrics.delivery_rate, 2.0), False), (Client.id, False)]),  # nothing due yet last
+    "effort": ("Most effort", [(func.coalesce(ClientMetrics.effort_minutes, 0), True), (Client.id, True)]),
+    "retainer_per_hour": ("Lowest retainer per hour", [
+        (func.coalesce(ClientMetrics.retainer_per_hour, 1e18), False), (Client.id, False)]),  # no effort last
+    "outstanding": ("Highest outstanding", [
+        (func.coalesce(ClientMetrics.outstanding_balance, 0.0), True), (Client.id, True)]),
+    "overdue": ("Highest overdue", [(func.coalesce(ClientMetrics.overdue_balance, 0.0), True), (Client.id, True)]),
+    "last_payment": ("Longest since payment", [
+        (func.coalesce(ClientMetrics.last_payment_date, date.min), False), (Client.id, False)]),  # never paid first
+}
+def _for_clients(query, column, client_ids):
+    return query if client_ids is None else query.filter(column.in_(client_ids))
+def compute_client_metrics(client_ids=None, today=None):
+    """ClientMetrics rows (as dicts) for ``client_ids``, or every client, from five grouped queries."""
+    today = today or date.today()
+    since = today - timedelta(days=current_app.config["SCORECARD_EFFORT_DAYS"])
+    balance = ClientInvoice.amount - ClientInvoice.amount_paid
+    content = {}
+    for client_id, status, count in _for_clients(
+        db.session.query(ContentItem.client_id, ContentItem.status, func.count()), ContentItem.client_id, client_ids
+    ).group_by(ContentItem.client_id, ContentItem.status):
+        content.setdefault(client_id, {})[status] = count
+    minutes = dict(_for_clients(
+        db.session.query(EffortRollup.client_id, func.sum(EffortRollup.minutes)), EffortRollup.client_id, client_ids
+    ).filter(EffortRollup.day > since, EffortRollup.day <= today).group_by(EffortRollup.client_id).all())
+    balances = {client_id: (outstanding, overdue) for client_id, outstanding, overdue in _for_clients(
+        db.session.query(
+            ClientInvoice.client_id, func.sum(balance),
+            func.sum(case((ClientInvoice.status == "overdue", balance), else_=0.0)),
+        ), ClientInvoice.client_id, client_ids
+    ).filter(ClientInvoice.status != "paid").group_by(ClientInvoice.client_id)}
+    last_paid = dict(_for_clients(
+        db.session.query(ClientPayment.client_id, func.max(ClientPayment.payment_date)), ClientPayment.client_id,
+        client_ids
+    ).group_by(ClientPayment.client_id).all())
+    now = datetime.utcnow()
+    rows = []
+    for client_id, retainer in _for_clients(
+        db.session.query(Client.id, Client.monthly_retainer), Client.id, client_ids
+    ):
+        counts = content.get(client_id, {})
+        done, overdue, skipped = (counts.get(s, 0) for s in ("done", "overdue", "skipped"))
+        effort = minutes.get(client_id) or 0
+        outstanding, overdue_balance = balances.get(client_id, (0.0, 0.0))
+        rows.append({
+            "client_id": client_id,
+            "content_planned": counts.get("planned", 0),
+            "content_done": done,
+            "content_overdue": overdue,
+            "content_skipped": skipped,
+            "delivery_rate": round(done / (done + overdue + skipped), 4) if done + overdue + skipped else None,
+            "effort_minutes": effort,
+            "retainer_per_hour": round((retainer or 0) / (effort / 60), 2) if effort else None,
+            "outstanding_balance": round(outstanding or 0.0, 2),
+            "overdue_balance": round(overdue_balance or 0.0, 2),
+            "last_payment_date": last_paid.get(client_id),
+            "updated_at": now,
+        })
+    return rows
+def refresh_client_metrics(client_ids=None, today=None):
+    """Replace the ClientMetrics rows of ``client_ids``, or of every client (caller commits).
+
+    Returns the number of rows written.
+    """
+    if client_ids is not None:
+        client_ids = sorted(set(client_ids))
+        if not client_ids:
+            return 0
+    rows = compute_client_metrics(client_ids, today)
+    _for_clients(db.session.query(ClientMetrics), ClientMetrics.client_id, client_ids).delete(
+        synchronize_session=False)
+    if rows:
+        db.session.execute(ClientMetrics.__table__.insert(), rows)
+    return len(rows)
+def queue_client_metrics(client_ids=None):
+    """Queue a scorecard refresh for ``client_ids``, or for every client when None (caller commits)."""
+    if client_ids is not None:
+        client_ids = sorted({client_id for client_id in client_ids if client_id is not None})
+        if not client_ids:
+            return False
+    return enqueue_job("client_metrics", {"client_ids": client_ids})
+def client_scorecard(client_id):
+    """(client, metrics) for one client from a single primary-key join; metrics is None until computed."""
+    return db.session.query(Client, ClientMetrics).outerjoin(
+        ClientMetrics, ClientMetrics.client_id == Client.id
+    ).filter(Client.id == client_id).first()
+@job_handler("client_metrics")
+def client_metrics_job(client_ids):
+    refresh_client_metrics(client_ids)
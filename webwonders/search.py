@@ -0,0 +1,88 @@
+import re
+from sqlalchemy import text
+from .database import db
+# ----------------------
+# Full-text search
+# ----------------------
+# On SQLite, clients, content items, tasks and invoices are mirrored into an
+# FTS5 table by triggers, so every write path (forms, bulk UPDATEs, imports)
+# keeps it in sync. The rowid encodes the source row: id * 4 + kind.
+SEARCH_KINDS = ("client", "content", "task", "invoice")
+SEARCH_INDEX_SOURCES = {
+    # kind: (table, title expression, body expression) over the row alias "r"
+    "client": ("client", "r.name", "coalesce(r.brand_name, '') || ' ' || coalesce(r.notes, '')"),
+    "content": ("content_item", "r.title",
+                "coalesce(r.caption, '') || ' ' || coalesce(r.remarks, '') || ' ' || coalesce(r.platform, '')"),
+    "task": ("task", "r.title", "coalesce(r.description, '')"),
+    "invoice": ("client_invoice", "(SELECT name FROM client WHERE id = r.client_id)", "r.month"),
+}
+def _search_index_triggers():
+    statements = []
+    for kind, (table, title, body) in SEARCH_INDEX_SOURCES.items():
+        code = SEARCH_KINDS.index(kind)
+        insert = "INSERT INTO search_index(rowid, title, body) VALUES (new.id * 4 + %d, %s, %s);" % (
+            code, title.replace("r.", "new."), body.replace("r.", "new."))
+        delete = "DELETE FROM search_index WHERE rowid = old.id * 4 + %d;" % code
+        columns = sorted(set(re.findall(r"r\.(\w+)", title + " " + body)))
+        statements += [
+            "CREATE TRIGGER IF NOT EXISTS %s_search_ai AFTER INSERT ON %s BEGIN %s END" % (table, table, insert),
+            "CREATE TRIGGER IF NOT EXISTS %s_search_ad AFTER DELETE ON %s BEGIN %s END" % (table, table, delete),
+            "CREATE TRIGGER IF NOT EXISTS %s_search_au AFTER UPDATE OF %s ON %s BEGIN %s %s END" % (
+                table, ", ".join(columns), table, delete, insert),
+        ]
+    # Invoices are indexed under their client's name
+    statements.append(
+        "CREATE TRIGGER IF NOT EXISTS client_search_invoice_au AFTER UPDATE OF name ON client BEGIN "
+        "UPDATE search_index SET title = new.name "
+        "WHERE rowid IN (SELECT id * 4 + 3 FROM client_invoice WHERE client_id = new.id); END"
+    )
+    return statements
+SEARCH_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+] + _search_index_triggers()
+def rebuild_search_index(conn):
+    """Repopulate the FTS table from the source tables; returns the row count."""
+    conn.exec_driver_sql("DELETE FROM search_index")
+    for kind, (table, title, body) in SEARCH_INDEX_SOURCES.items():
+        conn.exec_driver_sql(
+            "INSERT INTO search_index(rowid, title, body) SELECT r.id * 4 + %d, %s, %s FROM %s AS r"
+            % (SEARCH_KINDS.index(kind), title, body, table)
+        )
+    return conn.exec_driver_sql("SELECT count(*) FROM search_index").scalar()
+_search_index_present = {}
+def search_index_available():
+    engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return False
+    if not _search_index_present.get(engine.url):
+        # Only a hit is remembered, so `flask init-db` takes effect without a restart
+        _search_index_present[engine.url] = bool(db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+        )).scalar())
+    return _search_index_present[engine.url]
+def fts_match_expression(q):
+    """Turn free text into an FTS5 query where every word is a quoted prefix."""
+    return " ".join('"%s"*' % word for word in re.findall(r"\w+", q))
+def full_text_search(q, limit):
+    """Best-ranked matches per kind as {kind: [ids]}, titles weighted above bodies."""
+    ids = {kind: [] for kind in SEARCH_KINDS}
+    match = fts_match_expression(q)
+    if not match:
+        return ids
+    rows = db.session.execute(text(
+        "SELECT rowid FROM ("
+        "  SELECT rowid, row_number() OVER (PARTITION BY rowid % 4 ORDER BY score) AS n FROM ("
+        "    SELECT rowid, bm25(search_index, 5.0, 1.0) AS score FROM search_index"
+        "    WHERE search_index MATCH :match"
+        "  )"
+        ") WHERE n <= :limit ORDER BY n"
+    ), {"match": match, "limit": limit})
+    for (rowid,) in rows:
+        ids[SEARCH_KINDS[rowid % 4]].append(rowid // 4)
+    return ids
+def in_rank_order(query, model, ids):
+    if not ids:
+        return []
+    rows = {row.id: row for row in query.filter(model.id.in_(ids))}
+    return [rows[i] for i in ids if i in rows]
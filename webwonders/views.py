@@ -0,0 +1,600 @@
+import hashlib
+import io
+from flask import (
+    Blueprint, Response, abort, current_app, render_template, request, redirect, stream_with_context, url_for,
+    flash,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager
+from werkzeug.http import is_resource_modified
+from datetime import date, timedelta, timezone
+from .database import db, writes_on_get
+from .models import (
+    CONTENT_STATUSES, TASK_STATUSES, Client, ClientInvoice, ClientMetrics, ContentItem, EffortLog, Employee,
+    PaymentOut, Projection, RevenueRollup, Task, set_status,
+)
+from .cache import cached_fragment, cached_page, client_choices, employee_choices
+from .jobs import enqueue_job
+from .search import full_text_search, in_rank_order, search_index_available
+from .pagination import (
+    CLIENT_ORDER, CONTENT_ITEM_ORDER, EFFORT_LOG_ORDER, INVOICE_ORDER, TASK_ORDER, content_item_query,
+    effort_log_query, invoice_query, keyset_page, task_query,
+)
+from .scorecard import SCORECARD_SORTS, client_scorecard, queue_client_metrics
+from .scheduler import queue_overdue_check
+from .analytics import (
+    EFFORT_GRANULARITIES, EFFORT_PERIODS, effort_period_start, effort_profitability, effort_series,
+    effort_summary, get_dashboard_snapshot, ledger_categories, ledger_client_margins, ledger_pnl,
+    parse_month, record_payment_out, render_projection_card,
+)
+from .accounts import AGING_BUCKETS, plan_billing_run, receivables_aging, record_payment, run_billing
+from .imports import IMPORT_KINDS, bulk_import, import_format_for
+from .exports import EXPORTS, EXPORT_MIMETYPES, stream_export
+from .planner import calendar_json, json_response, planner_calendar, planner_freshness, planner_period
+from .workload import TASK_PRIORITIES, WORKLOAD_HORIZONS, employee_workload
+# ----------------------
+# Routes
+# ----------------------
+bp = Blueprint("main", __name__)
+@bp.route("/")
+def dashboard():
+    return render_template("dashboard.html", **get_dashboard_snapshot())
+# -------- Clients --------
+@bp.route("/clients")
+@cached_page(Client, ClientMetrics)
+def clients():
+    q = request.args.get("q", "")
+    sort = request.args.get("sort", "name")
+    if sort not in SCORECARD_SORTS:
+        abort(400, "sort must be one of %s" % ", ".join(SCORECARD_SORTS))
+    query = Client.query.outerjoin(ClientMetrics).options(contains_eager(Client.metrics))
+    if q:
+        query = query.filter(Client.name.ilike(f"%{q}%"))
+    all_clients, next_after = keyset_page(query, SCORECARD_SORTS[sort][1], request.args.get("after"))
+    return render_template("clients.html", clients=all_clients, q=q, sort=sort, sorts=SCORECARD_SORTS,
+                           next_after=next_after, today=date.today())
+@bp.route("/clients/<int:client_id>")
+@cached_page(Client, ClientMetrics)
+def client_detail(client_id):
+    row = client_scorecard(client_id)
+    if row is None:
+        abort(404)
+    return render_template("client_detail.html", client=row[0], metrics=row[1], today=date.today(),
+                           effort_days=current_app.config["SCORECARD_EFFORT_DAYS"])
+@bp.route("/clients/new", methods=["GET", "POST"])
+def new_client():
+    if request.method == "POST":
+        name = request.form.get("name")
+        brand_name = request.form.get("brand_name")
+        start_date_str = request.form.get("start_date")
+        monthly_retainer = float(request.form.get("monthly_retainer") or 0)
+        status = request.form.get("status") or "active"
+        notes = request.form.get("notes")
+        start_date_val = date.fromisoformat(start_date_str) if start_date_str else date.today()
+        client = Client(
+            name=name,
+            brand_name=brand_name,
+            start_date=start_date_val,
+            monthly_retainer=monthly_retainer,
+            status=status,
+            notes=notes,
+        )
+        db.session.add(client)
+        db.session.flush()
+        queue_client_metrics([client.id])
+        db.session.commit()
+        flash("Client created successfully!", "success")
+        return redirect(url_for(".clients"))
+    return render_template("client_form.html", client=None)
+@bp.route("/clients/<int:client_id>/edit", methods=["GET", "POST"])
+def edit_client(client_id):
+    client = Client.query.get_or_404(client_id)
+    if request.method == "POST":
+        client.name = request.form.get("name")
+        client.brand_name = request.form.get("brand_name")
+        start_date_str = request.form.get("start_date")
+        client.start_date = date.fromisoformat(start_date_str) if start_date_str else client.start_date
+        client.monthly_retainer = float(request.form.get("monthly_retainer") or 0)
+        client.status = request.form.get("status") or client.status
+        client.notes = request.form.get("notes")
+        queue_client_metrics([client.id])
+        db.session.commit()
+        flash("Client updated!", "success")
+        return redirect(url_for(".clients"))
+    return render_template("client_form.html", client=client)
+# -------- Content Planner --------
+@bp.route("/planner")
+@cached_page(ContentItem, Client)
+def planner():
+    client_id = request.args.get("client_id", type=int)
+    view, start_date, end_date = planner_period(request.args, date.today())
+    return render_template(
+        "planner.html",
+        calendar=planner_calendar(start_date, end_date, client_id),
+        clients=client_choices(),
+        selected_client_id=client_id,
+        view=view,
+        month_str=start_date.strftime("%Y-%m"),
+        start_date=start_date,
+        end_date=end_date,
+    )
+@bp.route("/planner/calendar.json")
+def planner_calendar_json():
+    """The planner buckets for a client-side calendar, with ETag/Last-Modified."""
+    client_id = request.args.get("client_id", type=int)
+    _, start, end = planner_period(request.args, date.today())
+    count, latest = planner_freshness(start, end, client_id)
+    clients = client_choices()
+    etag = hashlib.sha1(repr((start, end, client_id, count, latest, clients)).encode()).hexdigest()
+    last_modified = latest.replace(tzinfo=timezone.utc) if latest else None
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        resp = json_response(calendar_json(planner_calendar(start, end, client_id), clients))
+    else:
+        resp = Response(status=304)
+    resp.set_etag(etag)
+    resp.last_modified = last_modified
+    resp.cache_control.no_cache = True
+    return resp
+@bp.route("/planner/new", methods=["GET", "POST"])
+def planner_new():
+    clients = client_choices()
+    if request.method == "POST":
+        client_id = int(request.form.get("client_id"))
+        date_str = request.form.get("date")
+        platform = request.form.get("platform")
+        content_type = request.form.get("content_type")
+        title = request.form.get("title")
+        caption = request.form.get("caption")
+        item = ContentItem(
+            client_id=client_id,
+            date=date.fromisoformat(date_str),
+            platform=platform,
+            content_type=content_type,
+            title=title,
+            caption=caption,
+            status="planned",
+        )
+        db.session.add(item)
+        db.session.flush()
+        queue_overdue_check(item)
+        queue_client_metrics([client_id])
+        db.session.commit()
+        flash("Content item added!", "success")
+        return redirect(url_for(".planner"))
+    return render_template("planner_form.html", clients=clients, item=None)
+@bp.route("/planner/<int:item_id>/edit", methods=["GET", "POST"])
+def planner_edit(item_id):
+    item = ContentItem.query.get_or_404(item_id)
+    if request.method == "POST":
+        queue_client_metrics([item.client_id, int(request.form.get("client_id"))])
+        item.client_id = int(request.form.get("client_id"))
+        date_str = request.form.get("date")
+        item.date = date.fromisoformat(date_str)
+        item.platform = request.form.get("platform")
+        item.content_type = request.form.get("content_type")
+        item.title = request.form.get("title")
+        item.caption = request.form.get("caption")
+        item.status = request.form.get("status") or item.status
+        item.posted_url = request.form.get("posted_url")
+        item.remarks = request.form.get("remarks")
+        queue_overdue_check(item)
+        db.session.commit()
+        flash("Content item updated!", "success")
+        return redirect(url_for(".planner"))
+    clients = client_choices()
+    return render_template("planner_form.html", clients=clients, item=item)
+@bp.route("/planner/<int:item_id>/status/<status>")
+@writes_on_get
+def planner_status(item_id, status):
+    if status in CONTENT_STATUSES:
+        if not set_status(ContentItem, [item_id], status):
+            abort(404)
+        queue_client_metrics([db.session.query(ContentItem.client_id).filter_by(id=item_id).scalar()])
+        db.session.commit()
+        flash("Status updated!", "success")
+    return redirect(request.referrer or url_for(".planner"))
+# -------- Effort Logs --------
+@bp.route("/efforts", methods=["GET", "POST"])
+def efforts():
+    if request.method == "POST":
+        client_id = int(request.form.get("client_id"))
+        date_str = request.form.get("date")
+        posts_count = int(request.form.get("posts_count") or 0)
+        reels_count = int(request.form.get("reels_count") or 0)
+        time_minutes = int(request.form.get("time_minutes") or 0)
+        notes = request.form.get("notes")
+        log = EffortLog(
+            client_id=client_id,
+            employee_id=request.form.get("employee_id", type=int),
+            date=date.fromisoformat(date_str),
+            posts_count=posts_count,
+            reels_count=reels_count,
+            time_minutes=time_minutes,
+            notes=notes,
+        )
+        db.session.add(log)
+        db.session.flush()
+        enqueue_job("effort_rollup", {"log": {c.key: getattr(log, c.key) for c in EffortLog.__table__.columns}},
+                    key="effort_rollup:%d" % log.id)
+        db.session.commit()
+        flash("Effort log added!", "success")
+        return redirect(url_for(".efforts"))
+    clients = client_choices()
+    # filters
+    client_id = request.args.get("client_id", type=int)
+    period = request.args.get("period", "month")
+    if period not in EFFORT_PERIODS:
+        period = "month"
+    today = date.today()
+    from_date = effort_period_start(period, today)
+
+    query = effort_log_query().filter(
+        EffortLog.date >= from_date,
+        EffortLog.date <= today
+    )
+    if client_id:
+        query = query.filter(EffortLog.client_id == client_id)
+    logs, next_after = keyset_page(query, EFFORT_LOG_ORDER, request.args.get("after"))
+
+    return render_template(
+        "efforts.html",
+        logs=logs,
+        next_after=next_after,
+        summary=effort_summary(from_date, today),
+        profitability=effort_profitability(from_date, today),
+        clients=clients,
+        employees=employee_choices(),
+        selected_client_id=client_id,
+        period=period,
+        periods=EFFORT_PERIODS,
+        from_date=from_date,
+        today=today,
+    )
+def _analytics_range(default_start, today):
+    start = request.args.get("start", type=date.fromisoformat) or default_start
+    end = request.args.get("end", type=date.fromisoformat) or today
+    if end < start:
+        abort(400, "end must not be before start")
+    return start, end
+@bp.route("/efforts/series.json")
+def effort_series_json():
+    """Effort totals per ?granularity=day|week|month between ?start= and ?end=."""
+    today = date.today()
+    start, end = _analytics_range(today - timedelta(days=29), today)
+    granularity = request.args.get("granularity", "day")
+    if granularity not in EFFORT_GRANULARITIES:
+        abort(400, "granularity must be one of %s" % ", ".join(EFFORT_GRANULARITIES))
+    series = effort_series(start, end, granularity, request.args.get("client_id", type=int))
+    return json_response({"start": start, "end": end, "granularity": granularity, "series": series})
+@bp.route("/efforts/profitability.json")
+def effort_profitability_json():
+    """Effort against prorated retainer per client between ?start= and ?end=."""
+    today = date.today()
+    start, end = _analytics_range(today.replace(day=1), today)
+    return json_response({
+        "start": start, "end": end, "hourly_cost": current_app.config["HOURLY_COST"],
+        "clients": effort_profitability(start, end),
+    })
+# -------- Tasks --------
+@bp.route("/tasks", methods=["GET", "POST"])
+def tasks():
+    clients = client_choices()
+    employees = employee_choices()
+
+    if request.method == "POST":
+        title = request.form.get("title")
+        description = request.form.get("description")
+        client_id = request.form.get("client_id")
+        assigned_to = request.form.get("assigned_to")
+        status = request.form.get("status") or "pending"
+        priority = request.form.get("priority") or "medium"
+        due_date_str = request.form.get("due_date")
+        t = Task(
+            title=title,
+            description=description,
+            client_id=int(client_id) if client_id else None,
+            assigned_to=int(assigned_to) if assigned_to else None,
+            status=status,
+            priority=priority,
+            due_date=date.fromisoformat(due_date_str) if due_date_str else None,
+        )
+        db.session.add(t)
+        db.session.flush()
+        queue_overdue_check(t)
+        db.session.commit()
+        flash("Task created!", "success")
+        return redirect(url_for(".tasks"))
+    # filters
+    status_filter = request.args.get("status")
+    employee_id = request.args.get("employee_id", type=int)
+    query = task_query()
+    if status_filter:
+        query = query.filter(Task.status == status_filter)
+    if employee_id:
+        query = query.filter(Task.assigned_to == employee_id)
+    all_tasks, next_after = keyset_page(query, TASK_ORDER, request.args.get("after"))
+    return render_template(
+        "tasks.html",
+        tasks=all_tasks,
+        next_after=next_after,
+        clients=clients,
+        employees=employees,
+        status_filter=status_filter,
+        employee_id=employee_id,
+    )
+@bp.route("/tasks/<int:task_id>/status/<status>")
+@writes_on_get
+def task_status(task_id, status):
+    if status in TASK_STATUSES:
+        if not set_status(Task, [task_id], status):
+            abort(404)
+        db.session.commit()
+        flash("Task status updated!", "success")
+    return redirect(request.referrer or url_for(".tasks"))
+# -------- Workload --------
+def _workload(today):
+    view, start, end = planner_period(request.args, today, default="week")
+    return view, employee_workload(start, end, today)
+@bp.route("/workload")
+@cached_page(Employee, Task, EffortLog, Client)
+def workload():
+    view, data = _workload(date.today())
+    return render_template("workload.html", view=view, priorities=TASK_PRIORITIES, horizons=WORKLOAD_HORIZONS,
+                           **data)
+@bp.route("/workload.json")
+@cached_page(Employee, Task, EffortLog, Client)
+def workload_json():
+    view, data = _workload(date.today())
+    return json_response(dict(data, view=view))
+# -------- Accounts --------
+@bp.route("/accounts", methods=["GET", "POST"])
+@cached_page(ClientInvoice, Client)
+def accounts():
+    clients = client_choices()
+    if request.method == "POST":
+        # Create invoice
+        client_id = int(request.form.get("client_id"))
+        month = request.form.get("month")  # YYYY-MM
+        try:
+            parse_month(month)
+        except ValueError:
+            flash("Month must be YYYY-MM.", "danger")
+            return redirect(url_for(".accounts"))
+        amount = float(request.form.get("amount") or 0)
+        due_date_str = request.form.get("due_date")
+        due_date_val = date.fromisoformat(due_date_str)
+        inv = ClientInvoice(
+            client_id=client_id,
+            month=month,
+            amount=amount,
+            due_date=due_date_val,
+            status="pending",
+        )
+        db.session.add(inv)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            flash("That client already has an invoice for %s." % month, "danger")
+            return redirect(url_for(".accounts"))
+        queue_overdue_check(inv)
+        queue_client_metrics([client_id])
+        db.session.commit()
+        flash("Invoice created!", "success")
+        return redirect(url_for(".accounts"))
+    # filters
+    client_id = request.args.get("client_id", type=int)
+    status_filter = request.args.get("status")
+
+    query = invoice_query()
+    if client_id:
+        query = query.filter(ClientInvoice.client_id == client_id)
+    if status_filter:
+        query = query.filter(ClientInvoice.status == status_filter)
+    invoices, next_after = keyset_page(query, INVOICE_ORDER, request.args.get("after"))
+    return render_template(
+        "accounts.html",
+        invoices=invoices,
+        next_after=next_after,
+        clients=clients,
+        selected_client_id=client_id,
+        status_filter=status_filter,
+    )
+@bp.route("/accounts/<int:invoice_id>/pay", methods=["GET", "POST"])
+def accounts_pay(invoice_id):
+    inv = ClientInvoice.query.get_or_404(invoice_id)
+    if request.method == "POST":
+        amount = float(request.form.get("amount") or 0)
+        payment_date_str = request.form.get("payment_date")
+        mode = request.form.get("mode")
+        reference = request.form.get("reference")
+        notes = request.form.get("notes")
+        record_payment(inv, amount, date.fromisoformat(payment_date_str), mode, reference, notes, defer=True)
+        queue_client_metrics([inv.client_id])
+        db.session.commit()
+        flash("Payment recorded!", "success")
+        return redirect(url_for(".accounts"))
+    return render_template("payment_form.html", invoice=inv)
+@bp.route("/accounts/receivables")
+def receivables():
+    rows, totals = receivables_aging()
+    return render_template("receivables.html", rows=rows, totals=totals, buckets=AGING_BUCKETS)
+@bp.route("/accounts/billing-run", methods=["GET", "POST"])
+def billing_run():
+    month = request.values.get("month") or date.today().strftime("%Y-%m")
+    try:
+        parse_month(month)
+    except ValueError:
+        flash("Month must be YYYY-MM.", "danger")
+        return redirect(url_for(".billing_run"))
+    if request.method == "POST":
+        created = run_billing(month)
+        flash("Created %d retainer invoices for %s." % (len(created), month), "success")
+        return redirect(url_for(".accounts"))
+    planned = plan_billing_run(month)
+    return render_template(
+        "billing_run.html",
+        month=month,
+        planned=planned,
+        total=sum(row["amount"] for row in planned),
+    )
+# -------- Ledger --------
+def _ledger_range(today):
+    """?start= and ?end= months (YYYY-MM), defaulting to the last 12 months."""
+    end = request.args.get("end") or today.strftime("%Y-%m")
+    start = request.args.get("start") or (parse_month(end) - timedelta(days=334)).strftime("%Y-%m")
+    try:
+        parse_month(start), parse_month(end)
+    except ValueError:
+        abort(400, "start and end must be YYYY-MM")
+    if end < start:
+        abort(400, "end must not be before start")
+    return start, end
+@bp.route("/ledger", methods=["GET", "POST"])
+def ledger():
+    if request.method == "POST":
+        related_client_id = request.form.get("related_client_id")
+        record_payment_out(
+            vendor_name=request.form.get("vendor_name"),
+            related_client_id=int(related_client_id) if related_client_id else None,
+            amount=float(request.form.get("amount") or 0),
+            payment_date=date.fromisoformat(request.form.get("payment_date")),
+            mode=request.form.get("mode"),
+            category=request.form.get("category") or "others",
+            notes=request.form.get("notes"),
+        )
+        db.session.commit()
+        flash("Payment out recorded!", "success")
+        return redirect(url_for(".ledger"))
+    today = date.today()
+    start, end = _ledger_range(today)
+    months, totals = ledger_pnl(start, end)
+    recent = PaymentOut.query.order_by(PaymentOut.payment_date.desc(), PaymentOut.id.desc()).limit(20).all()
+    return render_template(
+        "ledger.html",
+        start=start,
+        end=end,
+        months=months,
+        totals=totals,
+        categories=ledger_categories(start, end),
+        margins=ledger_client_margins(start, end),
+        recent=recent,
+        clients=client_choices(),
+        today=today,
+    )
+@bp.route("/ledger/pnl.json")
+def ledger_pnl_json():
+    """Monthly P&L and cash-out categories between ?start= and ?end= (YYYY-MM)."""
+    start, end = _ledger_range(date.today())
+    months, totals = ledger_pnl(start, end)
+    return json_response({
+        "start": start, "end": end, "months": months, "totals": totals, "categories": ledger_categories(start, end),
+    })
+@bp.route("/ledger/clients.json")
+def ledger_clients_json():
+    """Per-client net margin between ?start= and ?end= (YYYY-MM)."""
+    start, end = _ledger_range(date.today())
+    return json_response({"start": start, "end": end, "clients": ledger_client_margins(start, end)})
+# -------- Projection Wall --------
+@bp.route("/projection", methods=["GET", "POST"])
+@cached_page(Projection, RevenueRollup, ClientInvoice)
+def projection():
+    if request.method == "POST":
+        period_type = request.form.get("period_type")
+        start_date_str = request.form.get("start_date")
+        end_date_str = request.form.get("end_date")
+        target_revenue = float(request.form.get("target_revenue") or 0)
+        target_clients_count = int(request.form.get("target_clients_count") or 0)
+        description = request.form.get("description")
+        proj = Projection(
+            period_type=period_type,
+            start_date=date.fromisoformat(start_date_str),
+            end_date=date.fromisoformat(end_date_str),
+            target_revenue=target_revenue,
+            target_clients_count=target_clients_count,
+            description=description,
+        )
+        db.session.add(proj)
+        db.session.commit()
+        flash("Projection created!", "success")
+        return redirect(url_for(".projection"))
+    today = date.today()
+    all_projections = Projection.query.order_by(Projection.start_date.desc()).all()
+    return render_template(
+        "projection.html",
+        projection_card=cached_fragment("projection_card", [Projection, RevenueRollup, ClientInvoice],
+                                        render_projection_card),
+        all_projections=all_projections,
+        today=today,
+    )
+# -------- Global Search --------
+@bp.route("/search")
+def search():
+    q = request.args.get("q", "").strip()
+    clients = []
+    content_items = []
+    tasks = []
+    invoices = []
+    next_after = {}
+    if q and search_index_available():
+        ids = full_text_search(q, current_app.config["SEARCH_LIMIT"])
+        clients = in_rank_order(Client.query, Client, ids["client"])
+        content_items = in_rank_order(content_item_query(), ContentItem, ids["content"])
+        tasks = in_rank_order(Task.query, Task, ids["task"])
+        invoices = in_rank_order(invoice_query(), ClientInvoice, ids["invoice"])
+    elif q:
+        like = f"%{q}%"
+        # Each section pages on its own, e.g. ?q=acme&tasks_after=<token>
+        clients, next_after["clients"] = keyset_page(
+            Client.query.filter(Client.name.ilike(like)),
+            CLIENT_ORDER, request.args.get("clients_after"))
+        content_items, next_after["content"] = keyset_page(
+            content_item_query().filter(ContentItem.title.ilike(like)),
+            CONTENT_ITEM_ORDER, request.args.get("content_after"))
+        tasks, next_after["tasks"] = keyset_page(
+            Task.query.filter(Task.title.ilike(like)),
+            TASK_ORDER, request.args.get("tasks_after"))
+        invoices, next_after["invoices"] = keyset_page(
+            ClientInvoice.query.join(Client).filter(Client.name.ilike(like)).options(
+                contains_eager(ClientInvoice.client)
+            ),
+            INVOICE_ORDER, request.args.get("invoices_after"))
+    return render_template(
+        "search.html",
+        q=q,
+        clients=clients,
+        content_items=content_items,
+        tasks=tasks,
+        invoices=invoices,
+        next_after=next_after,
+    )
+# -------- Export --------
+@bp.route("/export/<kind>.<fmt>")
+def export(kind, fmt):
+    if kind not in EXPORTS or fmt not in EXPORT_MIMETYPES:
+        abort(404)
+    start = request.args.get("start")
+    end = request.args.get("end")
+    try:
+        start = date.fromisoformat(start) if start else None
+        end = date.fromisoformat(end) if end else None
+    except ValueError:
+        abort(400, "Dates must be YYYY-MM-DD")
+    body = stream_export(kind, fmt, start, end, request.args.get("client_id", type=int))
+    filename = "%s-%s.%s" % (kind, date.today().isoformat(), fmt)
+    return Response(stream_with_context(body), mimetype=EXPORT_MIMETYPES[fmt], headers={
+        "Content-Disposition": 'attachment; filename="%s"' % filename,
+    })
+# -------- Bulk Import --------
+@bp.route("/import", methods=["GET", "POST"])
+def bulk_import_view():
+    report = None
+    if request.method == "POST":
+        kind = request.form.get("kind")
+        upload = request.files.get("file")
+        if kind not in IMPORT_KINDS or not upload or not upload.filename:
+            flash("Choose what to import and a CSV or JSON file.", "danger")
+            return redirect(url_for(".bulk_import_view"))
+        stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+        report = bulk_import(kind, stream, import_format_for(upload.filename))
+    return render_template("import.html", kinds=IMPORT_KINDS, report=report)
@@ -0,0 +1,113 @@
+from flask import current_app
+from sqlalchemy import case, func
+from datetime import timedelta
+from .database import db
+from .models import EffortLog, Employee, Task
+from .cache import client_choices
+# ----------------------
+# Capacity engine
+# ----------------------
+# Per-employee load comes from two grouped queries whatever the headcount:
+# open tasks counted by assignee, priority and due-date horizon, and minutes
+# logged in the period by employee and client. Both read only the columns of
+# a covering index (ix_task_status_assignee_priority_due and
+# ix_effort_log_date_employee), so neither touches the table rows.
+OPEN_TASK_STATUSES = ("pending", "in_progress", "overdue")
+TASK_PRIORITIES = ("high", "medium", "low")
+# Due-date buckets of open tasks, relative to today
+WORKLOAD_HORIZONS = {
+    "overdue": "Overdue",
+    "week": "Due in 7 days",
+    "month": "Due in 8-30 days",
+    "later": "Later",
+    "undated": "No due date",
+}
+# Clients listed per employee as taking most of their logged time
+WORKLOAD_TOP_CLIENTS = 3
+def _due_horizon(today):
+    return case(
+        (Task.due_date.is_(None), "undated"),
+        (Task.due_date < today, "overdue"),
+        (Task.due_date <= today + timedelta(days=7), "week"),
+        (Task.due_date <= today + timedelta(days=30), "month"),
+        else_="later",
+    )
+def open_task_counts(today):
+    """{assignee id (None when unassigned): {"priority": {...}, "horizon": {...}, "open": n}}."""
+    horizon = _due_horizon(today)
+    rows = db.session.query(Task.assigned_to, Task.priority, horizon, func.count()).filter(
+        Task.status.in_(OPEN_TASK_STATUSES)
+    ).group_by(Task.assigned_to, Task.priority, horizon)
+    counts = {}
+    for employee_id, priority, bucket, count in rows:
+        load = counts.setdefault(employee_id, {
+            "priority": dict.fromkeys(TASK_PRIORITIES, 0),
+            "horizon": dict.fromkeys(WORKLOAD_HORIZONS, 0),
+            "open": 0,
+        })
+        load["priority"][priority] = load["priority"].get(priority, 0) + count
+        load["horizon"][bucket] += count
+        load["open"] += count
+    return counts
+def logged_minutes(start, end):
+    """{employee id (None when unattributed): {client id: minutes}} logged from ``start`` to ``end``."""
+    rows = db.session.query(EffortLog.employee_id, EffortLog.client_id, func.sum(EffortLog.time_minutes)).filter(
+        EffortLog.date >= start, EffortLog.date <= end
+    ).group_by(EffortLog.employee_id, EffortLog.client_id)
+    minutes = {}
+    for employee_id, client_id, total in rows:
+        minutes.setdefault(employee_id, {})[client_id] = total or 0
+    return minutes
+def _workload_row(load, by_client, capacity_hours, client_names):
+    load = load or {"priority": dict.fromkeys(TASK_PRIORITIES, 0), "horizon": dict.fromkeys(WORKLOAD_HORIZONS, 0),
+                    "open": 0}
+    hours = round(sum(by_client.values()) / 60, 2)
+    top = sorted(by_client.items(), key=lambda item: -item[1])[:WORKLOAD_TOP_CLIENTS]
+    return {
+        "open_tasks": load["open"],
+        "by_priority": load["priority"],
+        "by_horizon": load["horizon"],
+        "logged_hours": hours,
+        "capacity_hours": capacity_hours,
+        "utilization": round(hours / capacity_hours * 100, 1) if capacity_hours else None,
+        "over_capacity": capacity_hours is not None and hours > capacity_hours,
+        "top_clients": [
+            {"client_id": client_id, "client_name": client_names.get(client_id), "hours": round(minutes / 60, 2)}
+            for client_id, minutes in top
+        ],
+    }
+def employee_workload(start, end, today):
+    """Open tasks and hours logged against capacity for every employee, busiest first.
+
+    Capacity is each employee's weekly hours (WEEKLY_CAPACITY_HOURS unless
+    set on the employee) prorated to the days from ``start`` to ``end``.
+    Unassigned tasks and effort logged without an employee come back as
+    ``unassigned``.
+    """
+    weeks = ((end - start).days + 1) / 7
+    default_capacity = current_app.config["WEEKLY_CAPACITY_HOURS"]
+    tasks = open_task_counts(today)
+    minutes = logged_minutes(start, end)
+    client_names = {c["id"]: c["name"] for c in client_choices()}
+    employees = []
+    for employee_id, name, role, status, capacity in db.session.query(
+        Employee.id, Employee.name, Employee.role, Employee.status, Employee.weekly_capacity_hours
+    ):
+        weekly = default_capacity if capacity is None else capacity
+        row = _workload_row(tasks.get(employee_id), minutes.get(employee_id, {}), round(weekly * weeks, 2),
+                            client_names)
+        employees.append(dict(row, employee_id=employee_id, name=name, role=role, status=status,
+                              weekly_capacity_hours=weekly))
+    employees.sort(key=lambda row: (-(row["utilization"] or 0), -row["open_tasks"], row["name"]))
+    return {
+        "start": start,
+        "end": end,
+        "employees": employees,
+        "unassigned": _workload_row(tasks.get(None), minutes.get(None, {}), None, client_names),
+        "totals": {
+            "open_tasks": sum(load["open"] for load in tasks.values()),
+            "logged_hours": round(sum(sum(c.values()) for c in minutes.values()) / 60, 2),
+            "capacity_hours": round(sum(row["capacity_hours"] for row in employees), 2),
+            "over_capacity": sum(row["over_capacity"] for row in employees),
+        },
+    }